@@ -3,7 +3,7 @@
 """Goo - XML based user interface working with gunge"""
 
 
-__all__ = ['element', 'containers', 'controls', 'composite', 'style', 'parser', 'draw']
+__all__ = ['element', 'containers', 'controls', 'composite', 'style', 'parser', 'draw', 'damage', 'font', 'spatial', 'dispatch', 'atlas', 'imagecache']
 
 #temporary import
 import pygame, gunge
@@ -33,11 +33,28 @@ import goo.composite
 import goo.style
 import goo.parser
 import goo.draw
-
-#prepare image loader for goo internal resources
-img_loader = gunge.media.ImageLoader("goo/images", False)
+import goo.damage
+import goo.font
+import goo.spatial
+import goo.dispatch
+import goo.atlas
+import goo.imagecache
+
+#prepare image loader for goo internal resources. Icons are packed into a texture atlas
+img_loader = goo.atlas.AtlasLoader(gunge.media.ImageLoader("goo/images", False))
 xml_loader = gunge.media.ResourceLoader(("goo/xml", "."), False)
 
+# the icons goo uses itself, packed by init
+ICONS = ("check.png", "radio.png", "close.png", "minimize.png", "maximize.png")
+
+def init():
+    """pack goo's own icons into the atlas. Call this once the display is set up
+
+    icons are packed when they are first used otherwise. Those packed before there was a display
+    are converted to the display format the first time one is used after that.
+    """
+    img_loader.preload(*ICONS)
+
 
 #default styles
 goo.style.add(goo.style.Style("default_titlebar",
@@ -0,0 +1,148 @@
+#! /usr/bin/env python
+
+"""atlas.py - packing small images into a few large surfaces
+
+drawing many small icons from separate surfaces means a separate allocation, and often a
+different pixel format, for every one of them. An atlas copies them into large pages instead,
+and hands out subsurfaces of those pages, which blit like any other surface.
+"""
+
+import pygame
+
+
+class Atlas(object):
+    """a set of pages holding images, packed into rows ("shelves") from top to bottom
+
+    an image is put on the first shelf it fits on, or on a new shelf below the others if there is
+    none. When a page is full, a new page is made. Every image gets a pixel of empty space around
+    it, so that scaling or filtering never picks up pixels of its neighbours.
+
+    pages made before the display was set up can't be in its pixel format. They are converted by
+    convert, which AtlasLoader calls once there is a display.
+    """
+
+    def __init__(self, page_size=(512, 512)):
+        """create an empty atlas with pages of page_size pixels"""
+        self.page_size = page_size
+        self.pages = []
+        self.images = {}
+        # the indices of the pages that are not in the display format yet
+        self.unconverted = set()
+
+    def add(self, key, image):
+        """copy image into the atlas, and return the subsurface it is stored in"""
+        width, height = image.get_width() + 2, image.get_height() + 2
+        if width > self.page_size[0] or height > self.page_size[1]:
+            raise RuntimeError("image '%s' is too large for the atlas: %s" % (key, image.get_size()))
+
+        for page, shelves in self.pages:
+            pos = place(shelves, width, height, self.page_size)
+            if pos is not None:
+                break
+        else:
+            page, shelves = self.new_page(), []
+            if pygame.display.get_surface() is None:
+                self.unconverted.add(len(self.pages))
+            self.pages.append((page, shelves))
+            pos = place(shelves, width, height, self.page_size)
+
+        rect = pygame.Rect((pos[0] + 1, pos[1] + 1), image.get_size())
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        #a max blend onto the transparent page copies the pixels, alpha included, without blending
+        page.blit(image, rect, None, pygame.BLEND_RGBA_MAX)
+        subsurface = self.images[key] = page.subsurface(rect)
+        return subsurface
+
+    def new_page(self):
+        """make an empty page, in the display format if there is a display"""
+        page = pygame.Surface(self.page_size, pygame.SRCALPHA, 32)
+        if pygame.display.get_surface() is not None:
+            page = page.convert_alpha()
+        page.fill((0, 0, 0, 0))
+        return page
+
+    def convert(self):
+        """copy the pages made before there was a display into the display format
+
+        the images on them are handed out from the new pages from then on. Surfaces handed out
+        before keep working, they just blit from the old page.
+        """
+        if pygame.display.get_surface() is None:
+            return
+        for n in self.unconverted:
+            old, shelves = self.pages[n]
+            page = old.convert_alpha()
+            self.pages[n] = page, shelves
+            for key, image in self.images.items():
+                if image.get_parent() is old:
+                    self.images[key] = page.subsurface(pygame.Rect(image.get_offset(), image.get_size()))
+        self.unconverted.clear()
+
+    def find(self, key):
+        """return the (page, rect) an image is stored in, for blitting with an area argument"""
+        subsurface = self.images[key]
+        return subsurface.get_parent(), pygame.Rect(subsurface.get_offset(), subsurface.get_size())
+
+    def __contains__(self, key):
+        return key in self.images
+
+    def __len__(self):
+        return len(self.images)
+
+
+def place(shelves, width, height, page_size):
+    """find a spot for a width x height rect among the shelves of a page, and return its position
+
+    shelves is a list of [top, height, used width] lists, which is updated. Returns None if
+    the page is full.
+    """
+    for shelf in shelves:
+        top, shelf_height, used = shelf
+        if height <= shelf_height and used + width <= page_size[0]:
+            shelf[2] += width
+            return used, top
+
+    bottom = shelves[-1][0] + shelves[-1][1] if shelves else 0
+    if bottom + height > page_size[1]:
+        return None
+    shelves.append([bottom, height, width])
+    return 0, bottom
+
+
+class AtlasLoader(object):
+    """wraps an image loader, putting every image it loads into an atlas
+
+    used just like the loader it wraps: loader['check.png']. Images larger than max_size in either
+    direction are returned as they are. Every image is only loaded and packed once.
+    """
+
+    def __init__(self, loader, atlas=None, max_size=64):
+        """init AtlasLoader. loader is any object that returns images when indexed by name"""
+        self.loader = loader
+        self.atlas = atlas or Atlas()
+        self.max_size = max_size
+        self.large = {}
+
+    def __getitem__(self, name):
+        if self.atlas.unconverted and pygame.display.get_surface() is not None:
+            self.atlas.convert()
+        try:
+            return self.atlas.images[name]
+        except KeyError:
+            pass
+        try:
+            return self.large[name]
+        except KeyError:
+            pass
+
+        image = self.loader[name]
+        if image.get_width() > self.max_size or image.get_height() > self.max_size:
+            self.large[name] = image
+            return image
+        return self.atlas.add(name, image)
+
+    def preload(self, *names):
+        """load and pack images ahead of time, for example right after the display is set up"""
+        for name in names:
+            self[name]
@@ -0,0 +1,22 @@
+#! /usr/bin/env python
+
+"""benchmarks - timing scripts for goo's performance sensitive code
+
+every module is a script. Run them from the directory containing goo, for example:
+
+    python -m goo.benchmarks.wrap
+"""
+
+import time
+
+
+def best_of(repeat, func, *args):
+    """call func(*args) repeat times and return the fastest time, in seconds"""
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func(*args)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
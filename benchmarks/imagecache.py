@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+
+"""benchmark loading images cold (decoding PNG files) and warm (from the image cache)
+
+a set of noisy PNG images is generated in a temporary directory. The cold time is for loading all
+of them through an empty cache and saving it, the warm time for loading them again through a
+fresh cache opened from the saved file, like a second start of the program would.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import pygame
+import goo
+import goo.benchmarks
+import goo.imagecache
+
+COUNTS = (50, 200)
+SIZE = (256, 256)
+
+
+def make_images(directory, count, seed=0):
+    """write count noisy PNG images to directory, and return their paths"""
+    rand = random.Random(seed)
+    paths = []
+    for n in range(count):
+        image = pygame.Surface(SIZE, pygame.SRCALPHA, 32)
+        for i in range(200):
+            color = tuple(rand.randint(0, 255) for c in range(4))
+            rect = (rand.randint(0, SIZE[0]), rand.randint(0, SIZE[1]), rand.randint(4, 64), rand.randint(4, 64))
+            image.fill(color, rect)
+        path = os.path.join(directory, "image%d.png" % n)
+        pygame.image.save(image, path)
+        paths.append(path)
+    return paths
+
+def load_all(cache_file, paths):
+    """open the cache, load every image through it and save it"""
+    cache = goo.imagecache.ImageCache(cache_file)
+    for path in paths:
+        cache.load(path)
+    cache.save()
+
+def cold(cache_file, paths):
+    """load with an empty cache"""
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+    load_all(cache_file, paths)
+
+def main():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+
+    print "%8s %14s %12s %12s" % ("images", "decode (ms)", "cold (ms)", "warm (ms)")
+    directory = tempfile.mkdtemp()
+    try:
+        cache_file = os.path.join(directory, "images.cache")
+        for count in COUNTS:
+            paths = make_images(directory, count)
+            decode = goo.benchmarks.best_of(3, lambda: [pygame.image.load(path) for path in paths])
+            cold_time = goo.benchmarks.best_of(3, cold, cache_file, paths)
+            warm_time = goo.benchmarks.best_of(3, load_all, cache_file, paths)
+            print "%8d %14.2f %12.2f %12.2f" % (count, decode * 1000, cold_time * 1000, warm_time * 1000)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#! /usr/bin/env python
+
+"""benchmark layout of deep and wide generated element trees
+
+for each tree the time to build it (create and measure every element) and the time to
+arrange it again is reported. Both should grow linearly with the number of elements.
+"""
+
+import os
+import StringIO
+import pygame
+import goo
+import goo.benchmarks
+
+
+def wide_tree(n):
+    """a single container holding n buttons"""
+    buttons = ''.join('<Button text="button %d"/>' % i for i in range(n))
+    return '<gamegoo><Container>%s</Container></gamegoo>' % buttons
+
+def deep_tree(n):
+    """n nested expanding sizers with a button at the bottom"""
+    return '<gamegoo>%s<Button text="bottom"/>%s</gamegoo>' % ('<Sizer expand="True">' * n, '</Sizer>' * n)
+
+def count(widget):
+    """count the elements in a tree"""
+    return 1 + sum(count(child) for child in getattr(widget, 'children', ()))
+
+def main():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((800, 600))
+
+    print "%6s %8s %10s %12s %12s" % ("tree", "n", "elements", "build (ms)", "arrange (ms)")
+    for name, make_tree, sizes in (("wide", wide_tree, (100, 1000, 5000)),
+                                   ("deep", deep_tree, (10, 50, 100))):
+        for n in sizes:
+            source = make_tree(n)
+            widget = goo.parser.load_xml(StringIO.StringIO(source))
+            build = goo.benchmarks.best_of(3, lambda: goo.parser.load_xml(StringIO.StringIO(source)).kill())
+            arrange = goo.benchmarks.best_of(5, widget.arrange, pygame.Rect(10, 10, 0, 0))
+            print "%6s %8d %10d %12.2f %12.2f" % (name, n, count(widget), build * 1000, arrange * 1000)
+            widget.kill()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+
+"""benchmark the per frame cost of UPDATE for static and dragged element trees
+
+a frame calls the UPDATE handler of every element that has one, the way gunge does. A static tree
+should cost next to nothing per frame, no matter how many elements it holds. A dragged tree moves
+its root every frame, which costs time proportional to the number of elements that move.
+"""
+
+import os
+import StringIO
+import pygame
+import gunge.event, gunge.sprite
+import goo
+import goo.benchmarks
+import goo.benchmarks.layout
+
+
+def elements(widget):
+    """all elements in a tree"""
+    result = [widget]
+    for child in getattr(widget, 'children', ()):
+        result.extend(elements(child))
+    return result
+
+def handlers(widget):
+    """the UPDATE handlers a frame calls for a tree (elements that override update)"""
+    return [element.update for element in elements(widget)
+            if type(element).update.im_func is not gunge.sprite.Sprite.update.im_func]
+
+def frames(widget, count, drag):
+    """run count frames, moving widget one pixel to the right each frame if drag is set"""
+    event = pygame.event.Event(gunge.event.UPDATE, {})
+    update = handlers(widget)
+    for i in range(count):
+        if drag:
+            x, y = widget.pos
+            widget.pos = (x + 1, y)
+        for handler in update:
+            handler(event)
+
+def main():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((800, 600))
+
+    print "%8s %10s %18s %18s" % ("n", "elements", "static (ms/frame)", "dragged (ms/frame)")
+    for n in (100, 1000, 5000):
+        widget = goo.parser.load_xml(StringIO.StringIO(goo.benchmarks.layout.wide_tree(n)))
+        widget.arrange(pygame.Rect(10, 10, 0, 0))
+        static = goo.benchmarks.best_of(3, frames, widget, 100, False) / 100
+        dragged = goo.benchmarks.best_of(3, frames, widget, 100, True) / 100
+        print "%8d %10d %18.3f %18.3f" % (n, len(elements(widget)), static * 1000, dragged * 1000)
+        widget.kill()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#! /usr/bin/env python
+
+"""benchmark text wrapping on generated texts of 10 KB up to 1 MB
+
+the cold time includes measuring every word for the first time, the warm time
+is for wrapping the same text again with all word widths remembered.
+"""
+
+import random
+import pygame
+import goo
+import goo.benchmarks
+from goo.controls.text import wrap_multiline
+
+SIZES = (10 * 1024, 100 * 1024, 1024 * 1024)
+WORDS = ("the quick brown fox jumps over lazy dog quest log entry adventurer "
+         "dungeon dragon sword shield potion gold inventory supercalifragilistic").split()
+
+
+def make_text(size, seed=0):
+    """generate roughly size characters of text, in paragraphs of 20 to 80 words"""
+    rand = random.Random(seed)
+    paragraphs, length = [], 0
+    while length < size:
+        paragraph = ' '.join(rand.choice(WORDS) for i in range(rand.randint(20, 80)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+    return '\n'.join(paragraphs)[:size]
+
+def main():
+    pygame.font.init()
+    style = goo.style.get()
+
+    print "%10s %10s %12s %12s" % ("size", "lines", "cold (ms)", "warm (ms)")
+    for size in SIZES:
+        text = make_text(size)
+        goo.font.clear()
+        font = goo.font.get(style.font, style.font_height)
+        cold = goo.benchmarks.best_of(1, wrap_multiline, text, font, 300)
+        warm = goo.benchmarks.best_of(5, wrap_multiline, text, font, 300)
+        lines = len(wrap_multiline(text, font, 300))
+        print "%10d %10d %12.2f %12.2f" % (size, lines, cold * 1000, warm * 1000)
+
+if __name__ == '__main__':
+    main()
@@ -2,27 +2,33 @@
 
 """base.py - base Composite and Content classes"""
 
-import xml.dom.minidom as minidom
 import goo.containers
 import goo.parser
 import pygame
 import os
 
+@goo.parser.register
 class Composite(goo.containers.Sizer):
-    """Responsible for loading widgets from xml files and using them as children"""
+    """Responsible for loading widgets from xml files and using them as children
+
+    the element children of the composite tag are used to replace the Content tags in the file.
+    They are only kept while the composite is built.
+    """
 
     def __init__(self, parent, children, source, **attributes):
         """initialize this composite widget"""
-        self.childnodes = children
-        children = goo.parser.get_root(goo.xml_loader[source]).childNodes
+        self.content_nodes = [node for node in children if node.nodeType == goo.parser.ELEMENT_NODE]
+        children = goo.parser.get_template(source).childNodes
         for node in children:
-            if node.nodeType not in (3, 8):
+            if node.nodeType == goo.parser.ELEMENT_NODE:
                 new_attributes = goo.parser.get_attributes(node)
                 new_attributes.update(attributes)
                 break
         goo.containers.Sizer.__init__(self, parent, children, **new_attributes)
+        del self.content_nodes
 
 
+@goo.parser.register
 class Content(object):
     """return tag from original file with type and name
 
@@ -32,21 +38,19 @@ class Content(object):
     replaced with the first tag in the original file.
     """
     def __new__(cls, parent, tagtype=None, **attributes):
-        composite = cls.find_composite(parent)
-        node = cls.find_firstnode(composite)
-        if node is None or node.tagName != tagtype:
+        nodes = cls.find_composite(parent).content_nodes
+        if not nodes or nodes[0].tagName != tagtype:
             if attributes.get('optional') == "True":
                 return None
             else:
-                raise RuntimeError("tag to replace Content tag has wrong type: '%s'" % node.tagName)
+                raise RuntimeError("tag to replace Content tag has wrong type: '%s'" % (nodes[0].tagName if nodes else None))
+        node = nodes.pop(0)
 
-        widget = goo.parser.get_widget(node)
+        widget, takes_children = goo.parser.get_factory(node)
         new_attributes = goo.parser.get_attributes(node)
         attributes.update(new_attributes)
 
-        node.parentNode.removeChild(node)
-
-        if node.hasChildNodes():
+        if takes_children:
             return widget(parent, node.childNodes, **attributes)
         else:
             return widget(parent, **attributes)
@@ -59,10 +63,3 @@ class Content(object):
             if isinstance(parent, goo.NullParent):
                 raise RuntimeError("Content tag used in non-composite file")
         return parent
-
-    @staticmethod
-    def find_firstnode(parent):
-        """find the first non-text node in the node list"""
-        for node in parent.childnodes:
-            if node.nodeType != 3:
-                return node
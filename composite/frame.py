@@ -3,11 +3,18 @@
 """frame.py - a frame is a top-level-window, with a titlebar and everythin"""
 
 import base
+import goo.parser
 
 
+@goo.parser.register
 class Frame(base.Composite):
-    """A top level window with a title bar and optionally a statusbar and/or menubar"""
+    """A top level window with a title bar and optionally a statusbar and/or menubar
+
+    frames render into an offscreen surface by default (see Container), so dragging a
+    window around does not render its contents again. Pass cache="False" to turn this off.
+    """
     def __init__(self, parent, children, **attributes):
+        attributes.setdefault('cache', "True")
         base.Composite.__init__(self, parent, children, "frame.xml", **attributes)
         #make sure titlebar has right parent
         self.children[0].children[0].parent = self
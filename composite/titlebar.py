@@ -6,7 +6,9 @@ import base
 import gunge.event
 import pygame
 import goo
+import goo.parser
 
+@goo.parser.register
 class TitleBar(base.Composite):
     """a window titlebar, must have a Frame as parent"""
 
@@ -22,19 +24,16 @@ class TitleBar(base.Composite):
             (goo.BUTTONCLICK, self.on_maximize, {'objectid': 'maxi_window'}),
             (goo.BUTTONCLICK, self.on_close,    {'objectid': 'exit_window'}))
 
-    @gunge.event.bind(pygame.MOUSEBUTTONDOWN, {'button': 1})
     def on_mousedown(self, event):
         """start dragging if mouseclick on titlebar"""
         if self.rect.collidepoint(event.pos):
             self.dragging = True
             return gunge.event.HANDLE_STOP
 
-    @gunge.event.bind(pygame.MOUSEBUTTONUP, {'button': 1})
     def on_mouseup(self, event):
         """stop dragging"""
         self.dragging = False
 
-    @gunge.event.bind(pygame.MOUSEMOTION)
     def on_motion(self, event):
         """drag the parent window"""
         if self.dragging:
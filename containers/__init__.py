@@ -6,8 +6,9 @@ containers can (obviously) contain other elements, including other containers. D
 may draw different borders or backgrounds, and can also arrange their children differently
 """
 
-__all__ = ["base", "sizer"]
+__all__ = ["base", "sizer", "scroll"]
 
 from goo.containers.base  import Container, HrContainer
 from goo.containers.sizer import Sizer, HrSizer
 from goo.containers.panel import Panel
+from goo.containers.scroll import ScrollPanel
@@ -10,23 +10,77 @@ import goo.element, goo.parser, goo.draw
 import pygame
 import gunge.event
 
+@goo.parser.register
 class Container(goo.element.Element):
     """A basic container.
 
     The most basic of all containers. It draws a simple border around its
     elements and provides a background image. The box is not resizable,
     but it is nestable.
+
+    if the cache attribute is "True", the container renders itself and everything inside it
+    into an offscreen surface, which is only rasterized again when something inside changes.
+    Moving the container then only costs a single blit.
+
+    if the lazy attribute is "True", the container starts out hidden and empty, taking up the space
+    given by its width and height attributes. Its children are only built when it is first shown.
     """
+    takes_children = True
+    style_options = frozenset(['margin', 'padding'])
+
     def __init__(self, parent, children, **attributes):
         """initialize container"""
         goo.element.Element.__init__(self, parent, **attributes)
-        self.margin, self.padding = self.style['margin'], self.style['padding']
+        self.cached = attributes.get('cache', "False") == "True"
+        self.stale = True
+        self.offscreen = None
+        self.margin, self.padding = self.style.margin, self.style.padding
         self.min_width = self.min_height = self.padding
 
-        self.children = [goo.parser.parse(node, self) for node in children if node.nodeType != 8]
-        self.children = filter(lambda x: x is not None, self.children)
+        if attributes.get('lazy', "False") == "True":
+            self.pending, self.children = children, []
+            #only a show call on the container itself builds it, showing an ancestor does not
+            self.hidden = self.hidden_explicitly = True
+        else:
+            self.pending = None
+            self.build(children)
         self.create()
+
+    def build(self, children):
+        """create the children of the container from their nodes"""
+        self.children = [goo.parser.parse(node, self) for node in children]
+        self.children = filter(lambda x: x is not None, self.children)
+
+    def show(self):
+        """show the container. A lazy container builds its children the first time it is shown"""
+        if self.pending is not None:
+            children, self.pending = self.pending, None
+            self.build(children)
+            self.invalidate_layout()
+        goo.element.Element.show(self)
+
+    def set_hidden(self, hidden):
+        """hide or show the container along with everything inside it
+
+        children that were hidden themselves stay hidden when the container is shown. So do lazy
+        containers that were never shown.
+        """
+        goo.element.Element.set_hidden(self, hidden)
+        for child in self.children:
+            if hidden or not child.hidden_explicitly:
+                child.set_hidden(hidden)
+
+    def arrange(self, area):
+        """arrange the container inside its parent, then arrange its children inside the container
+
+        layout happens in two phases. While the element tree is built, every element measures the
+        size it needs (see Element.measure), and containers add up the sizes of their children.
+        Once the tree is complete, the top-level element is arranged, which arranges every element
+        below it exactly once.
+        """
+        area = goo.element.Element.arrange(self, area)
         self.arrange_children()
+        return area
 
     def arrange_children(self):
         """arrange the children of this container
@@ -35,12 +89,11 @@ class Container(goo.element.Element):
         Within that rectangle, the child is free to position itself. When done, the child must return a rectangle
         representing the actual space it is occupying, so that the container can give a suitable area to the next child
         """
+        remaining = space_after([child.measure()[1] for child in self.children], self.margin)
         self.nextchild_pos = [self.padding, self.padding]
-        for i, child in enumerate(self.children):
+        for child, after in zip(self.children, remaining):
             width = self.rect.width - self.nextchild_pos[0] - self.padding
-
-            height = self.rect.height - self.nextchild_pos[1] - sum(c.rect.height for c in self.children[i+1:])
-            height -= (len(self.children[i+1:]) * self.margin) + self.padding
+            height = self.rect.height - self.nextchild_pos[1] - after - self.padding
 
             area = child.arrange(pygame.Rect(self.nextchild_pos, (width, height)))
             self.nextchild_pos[1] = (area.bottom + self.margin)
@@ -51,12 +104,19 @@ class Container(goo.element.Element):
         many container attributes (for example, the minimum container dimensions) depend on the children inside it.
         Therefore, this function should be called with the child after the child has been created.
         """
-        if child.rect.width + self.padding > self.min_width:
-            self.min_width = child.rect.width + self.padding
-        self.min_height += (child.rect.height + self.margin)
+        width, height = child.measure()
+        if width + self.padding > self.min_width:
+            self.min_width = width + self.padding
+        self.min_height += (height + self.margin)
 
     def create(self):
         """render the container sprite."""
+        self.resize()
+        self.measure()
+        self.parent.adjust(self)
+
+    def resize(self):
+        """make the container rect large enough for the children it was adjusted to"""
         goo.element.Element.create(self)
 
         self.min_width += self.padding
@@ -66,26 +126,103 @@ class Container(goo.element.Element):
         if self.rect.height < self.min_height:
             self.rect.height = self.min_height
 
-        self.parent.adjust(self)
+    def remeasure(self):
+        """measure the container again from the sizes its children have now"""
+        self.margin, self.padding = self.style.margin, self.style.padding
+        self.min_width = self.min_height = self.padding
+        for child in self.children:
+            self.adjust(child)
+        self.resize()
+        self.measured = None
+        return self.measure()
+
+    def add(self, child):
+        """add a child created with this container as parent, and update the layout"""
+        self.children.append(child)
+        self.invalidate_layout()
+
+    def restyle(self, style, changed):
+        """switch to a new version of the style. A caching container also rasterizes again"""
+        goo.element.Element.restyle(self, style, changed)
+        if changed:
+            self.stale = True
 
     def kill(self):
         """unbind all events for this widget and any child widgets.
 
         It essentially ceases to exist, since it no longer receives update or render events. Or any events, for that matter.
         """
-        for child in self.children:
+        children, self.children = self.children, []
+        for child in children:
             child.kill()
         goo.element.Element.kill(self)
 
-    @gunge.event.bind(gunge.event.RENDER)
+    def draw(self, event):
+        """draw the container, blitting the offscreen surface if the container caches"""
+        if not self.cached:
+            goo.element.Element.draw(self, event)
+            return
+        if self.stale or self.offscreen is None or self.offscreen.get_size() != self.rect.size:
+            self.rasterize()
+        event.display.screen.blit(self.offscreen, self.rect)
+        self.dirty = False
+
+    def draw_subtree(self, event):
+        """draw the container and its children. A caching container draws its whole subtree itself"""
+        if self.hidden:
+            return
+        self.draw(event)
+        if not self.cached:
+            for child in self.children:
+                child.draw_subtree(event)
+
+    def rasterize(self):
+        """render the container and its entire subtree into the offscreen surface
+
+        the subtree is temporarily positioned as if the container was at (0, 0), so
+        all elements draw themselves at the right spot on the offscreen surface.
+        """
+        self.offscreen = goo.draw.alpha_surface(self.rect.size)
+        topleft = self.rect.topleft
+        self.rect.topleft = (0, 0)
+        self.reposition()
+
+        event = pygame.event.Event(gunge.event.RENDER, {'display': Offscreen(self.offscreen)})
+        self.render(event)
+        for child in self.children:
+            if not child.hidden:
+                child.draw_subtree(event)
+
+        self.rect.topleft = topleft
+        self.reposition()
+        self.stale = False
+
+    def place(self):
+        """move the children along with the container"""
+        goo.element.Element.place(self)
+        for child in self.children:
+            #children that were not arranged yet get their position when they are
+            if child.pos is None:
+                continue
+            child.rect.topleft = child.get_absolutepos()
+            child.place()
+
+    def reposition(self):
+        """recalculate the absolute positions of every element inside this container"""
+        for child in self.children:
+            child.rect.topleft = child.get_absolutepos()
+            if isinstance(child, Container):
+                child.reposition()
+
     def render(self, event):
         """render container decorations to the screen"""
         surface = event.display.screen
         #the bottom one is the box border, the top one the box itself
-        goo.draw.rounded_rect(surface, self.rect, (self.style['background_color'], 0, self.style['border_radius'], self.style['border_rounding']))
+        goo.draw.rounded_rect(surface, self.rect, (self.style.background_color, 0, self.style.border_radius, self.style.border_rounding))
         goo.draw.rounded_rect(surface, self.rect, self.style)
 
 
+@goo.parser.register
 class HrContainer(Container):
     """HorizontalContainer - similar to the basic container, but it arranges children horizontally"""
 
@@ -96,12 +233,11 @@ class HrContainer(Container):
         Within that rectangle, the child is free to position itself. When done, the child must return a rectangle
         representing the actual space it is occupying, so that the container can give a suitable area to the next child
         """
+        remaining = space_after([child.measure()[0] for child in self.children], self.margin)
         self.nextchild_pos = [self.padding, self.padding]
-        for i, child in enumerate(self.children):
+        for child, after in zip(self.children, remaining):
             height = self.rect.height - self.nextchild_pos[1] - self.padding
-
-            width = self.rect.width - self.nextchild_pos[0] - sum(c.rect.width for c in self.children[i+1:])
-            width -= (len(self.children[i+1:]) * self.margin) + self.padding
+            width = self.rect.width - self.nextchild_pos[0] - after - self.padding
 
             area = child.arrange(pygame.Rect(self.nextchild_pos, (width, height)))
             self.nextchild_pos[0] = (area.right + self.margin)
@@ -112,12 +248,13 @@ class HrContainer(Container):
         many container attributes (for example, the minimum container dimensions) depend on the children inside it.
         Therefore, this function should be called with the child after the child has been created.
         """
-        if child.rect.height + self.padding > self.min_height:
-            self.min_height = child.rect.height + self.padding
-        self.min_width += (child.rect.width + self.margin)
+        width, height = child.measure()
+        if height + self.padding > self.min_height:
+            self.min_height = height + self.padding
+        self.min_width += (width + self.margin)
 
-    def create(self):
-        """render the container sprite."""
+    def resize(self):
+        """make the container rect large enough for the children it was adjusted to"""
         goo.element.Element.create(self)
 
         self.min_width += self.padding - self.margin
@@ -127,4 +264,25 @@ class HrContainer(Container):
         if self.rect.height < self.min_height:
             self.rect.height = self.min_height
 
-        self.parent.adjust(self)
+
+class Offscreen(object):
+    """stands in for the display in the RENDER events used to rasterize caching containers
+
+    elements draw onto event.display.screen, which is the offscreen surface here.
+    """
+    def __init__(self, surface):
+        self.screen = surface
+
+
+def space_after(sizes, margin):
+    """for every size in a list of child sizes, the space needed by all children after it
+
+    this includes the margins between those children. It's computed in a single pass
+    from the back, so arranging children takes linear time.
+    """
+    after, total = [], 0
+    for size in reversed(sizes):
+        after.append(total)
+        total += size + margin
+    after.reverse()
+    return after
@@ -7,8 +7,10 @@ a standard container, arranging its children vertically.
 """
 
 import base
+import goo.parser
 
 
+@goo.parser.register
 class Panel(base.Container):
     """Simple container used inside Frames. Has no rounded corners and grey background"""
     def __init__(self, parent, children, size=(0, 0), **attributes):
@@ -0,0 +1,103 @@
+#! /usr/bin/env python
+
+"""scroll.py - a container showing a window onto a long list of items"""
+
+import base
+import goo.parser
+
+
+@goo.parser.register
+class ScrollPanel(base.Container):
+    """a container that shows a long list of items, a few rows at a time
+
+    the child of the ScrollPanel tag (a tag, or plain text for a StaticText row) is not built
+    directly, it is the template for a row. Only as many rows are built as fit inside the panel,
+    which takes its size from its width and height attributes. When the panel scrolls, the rows are
+    given other items (see assign) instead of being built again, so the length of the list makes no
+    difference. Scrolling happens a whole row at a time, with the mouse wheel or through scroll.
+
+    the items are set with set_items, and can be any sequence. Subclasses can build rows in code
+    by overriding make_row, and show items differently by overriding assign.
+    """
+    def __init__(self, parent, children, **attributes):
+        """init ScrollPanel"""
+        self.items = ()
+        self.first = 0
+        base.Container.__init__(self, parent, children, **attributes)
+        self.fill()
+
+    def build(self, children):
+        """keep the row template, and build a single row to find out how tall rows are"""
+        nodes = [node for node in children if node.nodeType == goo.parser.ELEMENT_NODE or
+                 (node.nodeType == goo.parser.TEXT_NODE and not node.data.isspace())]
+        self.template = nodes[0] if nodes else None
+        self.children = []
+        self.children.append(self.make_row())
+
+    def make_row(self):
+        """build a new row from the template"""
+        if self.template is None:
+            raise RuntimeError("ScrollPanel has no row template")
+        return goo.parser.parse(self.template, self)
+
+    def assign(self, row, item):
+        """show item in row. By default this sets the text of the row to the item"""
+        row.set_text(unicode(item))
+
+    def adjust(self, child):
+        """adjust the container to the width of a row. Rows don't change the height of the panel"""
+        width, height = child.measure()
+        if width + self.padding > self.min_width:
+            self.min_width = width + self.padding
+
+    def remeasure(self):
+        """measure the panel again, and build or remove rows to fit the new size"""
+        size = base.Container.remeasure(self)
+        self.fill()
+        return size
+
+    def fill(self):
+        """build or remove rows until there are exactly as many as fit in the panel"""
+        if not self.children:
+            #a lazy panel that was not shown yet
+            return
+        row_height = self.children[0].measure()[1] + self.margin
+        count = max(1, (self.rect.height - 2*self.padding + self.margin) // row_height)
+        while len(self.children) < count:
+            self.children.append(self.make_row())
+        while len(self.children) > count:
+            self.children[-1].kill()
+        self.refresh()
+
+    def refresh(self):
+        """give every row the item it shows, hiding the rows past the end of the list"""
+        for n, row in enumerate(self.children):
+            index = self.first + n
+            if index < len(self.items):
+                self.assign(row, self.items[index])
+            hidden = self.hidden or index >= len(self.items)
+            if row.hidden != hidden:
+                row.set_hidden(hidden)
+
+    def set_hidden(self, hidden):
+        """hide or show the panel. Rows past the end of the list stay hidden when it is shown"""
+        base.Container.set_hidden(self, hidden)
+        self.refresh()
+
+    def set_items(self, items):
+        """set the sequence of items shown in the panel"""
+        self.items = items
+        self.first = min(self.first, max(0, len(items) - len(self.children)))
+        self.refresh()
+
+    def scroll(self, lines):
+        """scroll the list by a number of rows. Negative numbers scroll up"""
+        last = max(0, len(self.items) - len(self.children))
+        first = min(max(self.first + lines, 0), last)
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def on_scroll(self, lines):
+        """the mouse wheel was turned over the panel"""
+        self.scroll(lines)
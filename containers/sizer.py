@@ -3,7 +3,9 @@
 """sizer.py - a container without any decorations"""
 
 import base
+import goo.parser
 
+@goo.parser.register
 class Sizer(base.Container):
     """Sizer - similar to wxPython sizers.
 
@@ -13,6 +15,7 @@ class Sizer(base.Container):
         base.Container.__init__(self, parent, children, style=style, **attributes)
 
 
+@goo.parser.register
 class HrSizer(base.HrContainer):
     """HrSizer - a horizontal sizer
 
@@ -11,8 +11,9 @@ class Control(goo.element.Element):
     def __init__(self, parent, **attributes):
         """initialize the control
         
-        all this currently does is create the element.
+        this creates the element, measures it and tells the parent about the new child.
         """
         goo.element.Element.__init__(self, parent, **attributes)
         self.create()
+        self.measure()
         self.parent.adjust(self)
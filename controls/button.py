@@ -2,13 +2,16 @@
 
 """button.py - buttons that can be pressed"""
 
-import base, goo.draw
+import base, goo.draw, goo.element, goo.font, goo.parser
 import pygame
 import gunge.event
 
 class BaseButton(base.Control):
     """Base class for all button functionality"""
 
+    mouseover = goo.element.state_property('mouseover', "True if the mouse is over the button")
+    down      = goo.element.state_property('down', "True while the button is held down")
+
     def __init__(self, parent, **attributes):
         """initialize button"""
         base.Control.__init__(self, parent, **attributes)
@@ -16,14 +19,12 @@ class BaseButton(base.Control):
         self.focus = False
         self.down = False
 
-    @gunge.event.bind(pygame.MOUSEBUTTONDOWN, {'button': 1})
     def on_mousedown(self, event):
         """Check if the mouse is on the button, and click if it is."""
         if not self.hidden and self.rect.collidepoint(event.pos):
             self.down = True
             return gunge.event.HANDLE_STOP
 
-    @gunge.event.bind(pygame.MOUSEBUTTONUP, {'button': 1})
     def on_mouseup(self, event):
         """release the button if the mouse is released, possibly click"""
         if self.down and not self.hidden and self.rect.collidepoint(event.pos):
@@ -43,14 +44,20 @@ class BaseButton(base.Control):
         self.img = goo.draw.alpha_surface(self.rect.size)
         goo.draw.rounded_rect(self.img, self.rect, self.style)
 
-    @gunge.event.bind(gunge.event.UPDATE)
-    def update(self, event):
-        """update the button"""
-        base.Control.update(self, event)
-        self.mouseover = self.rect.collidepoint(pygame.mouse.get_pos())
-        self.down = self.down and self.mouseover
+    def damage_rect(self):
+        """the button rect, plus the hover border drawn around it"""
+        width = self.style.border_width
+        return self.rect.inflate(2*width, 2*width)
+
+    def on_enter(self):
+        """the mouse moved onto the button"""
+        self.mouseover = True
+
+    def on_leave(self):
+        """the mouse moved off the button, which also cancels a click"""
+        self.mouseover = False
+        self.down = False
 
-    @gunge.event.bind(gunge.event.RENDER)
     def render(self, event):
         """render the base button
 
@@ -59,21 +66,25 @@ class BaseButton(base.Control):
         surface = event.display.screen
         if self.down:
             #draw clicked background
-            goo.draw.rounded_rect(surface, self.rect, (self.style['clicked_color'], 0, self.style['border_radius']))
+            goo.draw.rounded_rect(surface, self.rect, (self.style.clicked_color, 0, self.style.border_radius))
         elif self.mouseover:
             #draw hover background
-            goo.draw.rounded_rect(surface, self.rect, (self.style['hover_color'], 0, self.style['border_radius']))
+            goo.draw.rounded_rect(surface, self.rect, (self.style.hover_color, 0, self.style.border_radius))
 
         if self.mouseover:
             #draw border
-            style = [self.style['border_hover'], self.style['border_width'], self.style['border_radius']+2]
+            style = [self.style.border_hover, self.style.border_width, self.style.border_radius+2]
             goo.draw.rounded_rect(surface, self.rect.inflate(2*style[1], 2*style[1]), style)
         base.Control.render(self, event)
 
 
+@goo.parser.register
 class Button(BaseButton):
     """Class for a button with some text on it that can be clicked"""
 
+    style_options = frozenset(['font', 'font_height', 'font_color', 'margin',
+                               'border_color', 'border_width', 'border_radius', 'border_rounding'])
+
     def __init__(self, parent, text, **attributes):
         """Initialize the button"""
         self.text = text
@@ -81,16 +92,20 @@ class Button(BaseButton):
 
     def create(self):
         """creates the button"""
-        font = pygame.font.Font(self.style['font'], self.style['font_height'])
-        txtimg = font.render(self.text, True, self.style['font_color'])
+        font = self.style.get_font()
+        txtimg = goo.font.render(font, self.text, True, self.style.font_color)
         txtrect = txtimg.get_rect()
 
-        self.rect = pygame.Rect(0, 0, txtrect.width + self.style['margin'], txtrect.height + self.style['margin'])
+        self.rect = pygame.Rect(0, 0, txtrect.width + self.style.margin, txtrect.height + self.style.margin)
         BaseButton.create(self)
 
         self.txtimg = txtimg
 
-    @gunge.event.bind(gunge.event.RENDER)
+    def set_text(self, text):
+        """change the text on the button. The layout is updated in the next frame"""
+        self.text = text
+        self.invalidate_layout()
+
     def render(self, event):
         """render the button"""
         txtrect = self.txtimg.get_rect()
@@ -101,9 +116,12 @@ class Button(BaseButton):
         event.display.screen.blit(self.txtimg, txtrect)
 
 
+@goo.parser.register
 class IconButton(BaseButton):
     """A button not with text, but with an icon displayed on it"""
 
+    style_options = frozenset(['margin', 'border_color', 'border_width', 'border_radius', 'border_rounding'])
+
     def __init__(self, parent, image, **attributes):
         """initialize IconButton"""
         self.image = image
@@ -114,10 +132,9 @@ class IconButton(BaseButton):
         self.icon = goo.img_loader[self.image]
         icon_r = self.icon.get_rect()
 
-        self.rect = pygame.Rect(0, 0, icon_r.width + self.style['margin'], icon_r.height + self.style['margin'])
+        self.rect = pygame.Rect(0, 0, icon_r.width + self.style.margin, icon_r.height + self.style.margin)
         BaseButton.create(self)
 
-    @gunge.event.bind(gunge.event.RENDER)
     def render(self, event):
         """render the icon button"""
         icon_r = self.icon.get_rect()
@@ -3,13 +3,18 @@
 """implement a checkbox control"""
 
 import base
-import goo.draw
-import gunge.event
+import goo.draw, goo.element, goo.font, goo.parser
 import pygame
 
+@goo.parser.register
 class Checkbox(base.Control):
     """A checkbox control that can be flipped on or off"""
 
+    checked    = goo.element.state_property('checked', "True if the checkbox is checked")
+    mouse_over = goo.element.state_property('mouse_over', "True if the mouse is over the checkbox")
+
+    style_options = frozenset(['font', 'font_height', 'font_color', 'padding', 'background_color', 'border_color', 'border_width'])
+
     def __init__(self, parent, **attributes):
         """initialize Checkbox instance"""
         self.checked = attributes.get('checked', False) == "True"
@@ -20,21 +25,25 @@ class Checkbox(base.Control):
 
     def create(self):
         """create the checkbox surface"""
-        font = pygame.font.Font(self.style['font'], self.style['font_height'])
-        txtimg = font.render(self.description, True, self.style['font_color'])
+        font = self.style.get_font()
+        txtimg = goo.font.render(font, self.description, True, self.style.font_color)
         txtrect = txtimg.get_rect()
 
-        self.img = goo.draw.alpha_surface((16 + txtrect.width + 2*self.style['padding'], max(12, txtrect.height) + 2*self.style['padding']))
+        self.img = goo.draw.alpha_surface((16 + txtrect.width + 2*self.style.padding, max(12, txtrect.height) + 2*self.style.padding))
         self.rect = self.img.get_rect()
-        self.box_rect = pygame.Rect((self.style['padding'],)*2, (12, 12))
+        self.box_rect = pygame.Rect((self.style.padding,)*2, (12, 12))
         self.box_rect.centery = self.rect.height / 2.
 
-        self.img.fill(self.style['background_color'], self.box_rect)
-        self.img.blit(txtimg, (16, self.style['padding']))
+        self.img.fill(self.style.background_color, self.box_rect)
+        self.img.blit(txtimg, (16, self.style.padding))
 
-        pygame.draw.rect(self.img, self.style['border_color'], self.box_rect, self.style['border_width'])
+        pygame.draw.rect(self.img, self.style.border_color, self.box_rect, self.style.border_width)
+
+    def set_description(self, description):
+        """change the description next to the checkbox. The layout is updated in the next frame"""
+        self.description = description
+        self.invalidate_layout()
 
-    @gunge.event.bind(pygame.MOUSEBUTTONUP, {'button': 1})
     def on_mouseup(self, event):
         """if the MOUSEUP collides with the checkbox, change the checked attribute and send out a CHECKCHANGED event"""
         if self.rect.collidepoint(event.pos):
@@ -42,23 +51,21 @@ class Checkbox(base.Control):
             event = pygame.event.Event(goo.CHECKCHANGED, {'objectid': self.id, 'objecttype': type(self), 'checked': self.checked})
             pygame.event.post(event)
 
-    @gunge.event.bind(gunge.event.UPDATE)
-    def update(self, event):
-        """update the checkbox. Bound to gunge.event.UPDATE"""
-        base.Control.update(self, event)
-        self.mouse_over = self.rect.collidepoint(pygame.mouse.get_pos())
+    def on_enter(self):
+        """the mouse moved onto the checkbox"""
+        self.mouse_over = True
 
-        self.box_rect.topleft = self.rect.topleft
-        self.box_rect.left += self.style['padding']
-        self.box_rect.centery = self.rect.centery
+    def on_leave(self):
+        """the mouse moved off the checkbox"""
+        self.mouse_over = False
 
-    @gunge.event.bind(gunge.event.RENDER)
     def render(self, event):
-        """render the checkbox. Bound to gunge.event.RENDER"""
+        """render the checkbox. Called by Element.on_render"""
         surface = event.display.screen
         if self.mouse_over:
-            pygame.draw.rect(surface, self.style['hover_color'], self.rect, 0)
+            pygame.draw.rect(surface, self.style.hover_color, self.rect, 0)
         base.Control.render(self, event)
 
         if self.checked:
-            surface.blit(self.icon, (self.box_rect.left + 1, self.box_rect.top + 1))
+            x, y = self.rect.left + self.style.padding, self.rect.centery - 6
+            surface.blit(self.icon, (x + 1, y + 1))
@@ -3,15 +3,24 @@
 """file containing classes for boxes of text"""
 
 import base
-import goo.draw
+import textbuffer
+import goo.draw, goo.element, goo.font, goo.parser
 import gunge.event
 import pygame
-from itertools import chain
+import bisect
+import re
+from itertools import chain, islice
 
+# splits text up into words and the whitespace between them
+WORD_RE = re.compile(r'\S+|\s+', re.UNICODE)
 
+
+@goo.parser.register
 class StaticText(base.Control):
     """static box of text"""
 
+    style_options = frozenset(['font', 'font_height', 'font_color', 'padding'])
+
     def __init__(self, parent, text, **attributes):
         """init StaticText"""
         self.text = text
@@ -22,70 +31,108 @@ class StaticText(base.Control):
 
         This is required since the content changes with the size of the element.
         """
-        self.rect = base.Control.arrange(self, area)
-        self.font = self.style.font()
+        area = base.Control.arrange(self, area)
+        self.font = self.style.get_font()
         lines = wrap_multiline(self.text, self.font, self.rect.width)
         self.img = goo.draw.alpha_surface(self.rect.size)
 
         for n, line in enumerate(lines):
-            s = self.font.render(line, True, self.style['font_color'])
-            self.img.blit(s, (self.style['padding'], self.style['padding'] + n * (self.font.get_linesize())))
-        return self.rect
+            s = goo.font.render(self.font, line, True, self.style.font_color)
+            self.img.blit(s, (self.style.padding, self.style.padding + n * (self.font.get_linesize())))
+        return area
+
+    def set_text(self, text):
+        """change the text. It is wrapped again in the next frame"""
+        self.text = text
+        self.invalidate_layout()
 
-    @gunge.event.bind(gunge.event.RENDER)
     def render(self, event):
         """render StaticText element"""
         base.Control.render(self, event)
 
 
+goo.parser.register(StaticText, goo.parser.TEXT_TAG)
+
+
+@goo.parser.register
 class TextCtrl(base.Control):
-    """editable text control box"""
+    """editable text control box
+
+    the text is kept in a text buffer (see goo.controls.textbuffer). The type of buffer used is
+    taken from the storage class attribute, so subclasses can choose a different one.
+
+    every line of the text (separated by newlines) has its own AdvanceIndex in self.advances,
+    so an edit only measures the lines it touches. self.starts holds the position within its
+    line where each wrapped line starts, which places the cursor on the right wrapped line.
+    """
+
+    storage = textbuffer.GapBuffer
+
+    cursor_pos   = goo.element.state_property('cursor_pos', "index of the cursor in the text, None if the control has no focus")
+    cursor_blink = goo.element.state_property('cursor_blink', "True while the blinking cursor is visible")
+
+    style_options = frozenset(['font', 'font_height', 'font_color', 'padding'])
 
     def __init__(self, parent, text, **attributes):
         """init TextCtrl"""
-        self.text = text
+        self.buffer = self.storage(text)
         self.cursor_pos = None
         self.blink_count = 0
         self.cursor_blink = False
+        self.version, self.caret = 0, None
         base.Control.__init__(self, parent, style="default_text", **attributes)
 
-    @gunge.event.bind(pygame.MOUSEBUTTONDOWN, {'button': 1})
     def on_mousedown(self, event):
         """event handler for mouse click"""
         if self.rect.collidepoint(event.pos):
-            self.cursor_pos = 1 + find_cursorpos(event.pos[0] - (self.rect.left + self.style['padding']), self.text, self.font)
+            x = event.pos[0] - (self.rect.left + self.style.padding)
+            y = event.pos[1] - (self.rect.top + self.style.padding)
+            self.cursor_pos = self.position_at(x, y)
         else:
             self.cursor_pos = None
 
+    def on_blur(self):
+        """the mouse was clicked somewhere else, lose focus"""
+        self.cursor_pos = None
+
     @gunge.event.bind(pygame.KEYDOWN, {'unicode': lambda x: unicode.isalnum(x) or unicode.isspace(x)})
     def on_textentered(self, event):
         if self.cursor_pos is not None:
-            self.text = ''.join((self.text[:self.cursor_pos], event.unicode, self.text[self.cursor_pos:]))
+            self.edit(self.cursor_pos, 0, event.unicode.replace('\r', '\n'))
             self.cursor_pos += 1
-            self.render_text()
 
     @gunge.event.bind(pygame.KEYDOWN, {'key': set((pygame.K_BACKSPACE, pygame.K_DELETE))})
     def on_deletekey(self, event):
         """deletes one key to the left or right of the cursor"""
         if self.cursor_pos is not None:
-            if event.key is pygame.K_DELETE and self.cursor_pos < len(self.text):
-                self.text = self.text[:self.cursor_pos] + self.text[self.cursor_pos + 1:]
-                self.render_text()
+            if event.key is pygame.K_DELETE and self.cursor_pos < len(self.buffer):
+                self.edit(self.cursor_pos, 1, '')
             elif event.key is pygame.K_BACKSPACE and self.cursor_pos > 0:
-                self.text = self.text[:self.cursor_pos - 1] + self.text[self.cursor_pos:]
+                self.edit(self.cursor_pos - 1, 1, '')
                 self.cursor_pos -= 1
-                self.render_text()
-            print event.unicode
 
     @gunge.event.bind(pygame.KEYDOWN, {'key': set((pygame.K_RIGHT, pygame.K_LEFT))})
     def on_movekey(self, event):
         """moves cursor one space right"""
         if self.cursor_pos is not None:
-            if event.key == pygame.K_RIGHT and self.cursor_pos < len(self.text):
+            if event.key == pygame.K_RIGHT and self.cursor_pos < len(self.buffer):
                 self.cursor_pos += 1
             elif event.key == pygame.K_LEFT and self.cursor_pos > 0:
                 self.cursor_pos -= 1
 
+    def get_text(self):
+        """return the text inside the control"""
+        return self.buffer.text
+
+    def set_text(self, text):
+        """replace the entire text inside the control"""
+        self.buffer = self.storage(text)
+        if self.cursor_pos is not None:
+            self.cursor_pos = min(self.cursor_pos, len(text))
+        self.render_text()
+
+    text = property(get_text, set_text, doc="The text inside the control")
+
     def create(self):
         """create the rectangle of the TextCtrl
 
@@ -95,45 +142,160 @@ class TextCtrl(base.Control):
         by using the width of a lone "a" character.
         """
         base.Control.create(self)
-        self.font = self.style.font()
+        self.font = self.style.get_font()
         if self.rect.height == 0:
             self.rect.height = int(self.attributes.get("numlines", 1)) * self.font.get_linesize()
         if self.rect.width == 0:
             self.rect.width = int(self.attributes.get("charwidth", 20)) * self.font.size("a")[0]
-        self.rect.width += self.style['padding'] * 2
-        self.rect.height += self.style['padding'] * 2
+        self.rect.width += self.style.padding * 2
+        self.rect.height += self.style.padding * 2
         self.render_text()
 
     def render_text(self):
-        """render text inside the TextCtrl"""
-        lines = wrap_text(self.text, self.font, self.rect.width)
+        """render all text inside the TextCtrl
+
+        every line of the text (separated by newlines) is wrapped separately, and kept
+        in self.paragraphs, so edits only need to wrap the lines they touch again.
+        """
+        lines = self.text.split('\n')
+        self.paragraphs = [wrap_text(line, self.font, self.rect.width) for line in lines]
+        self.starts = [line_starts(line, wrapped) for line, wrapped in zip(lines, self.paragraphs)]
+        self.advances = [AdvanceIndex(line, self.font) for line in lines]
         self.img = goo.draw.alpha_surface(self.rect.size)
+        self.version += 1
 
-        for n, line in enumerate(lines):
-            if n * self.font.get_linesize() > self.rect.height:
+        for n, line in enumerate(islice(self.lines_from(0), self.visible_lines())):
+            self.render_line(n, line)
+        self.mark_dirty()
+
+    def edit(self, pos, count, text):
+        """replace count characters starting at pos with text
+
+        only the lines touched by the edit are wrapped again, and only the wrapped lines that
+        actually changed are rendered again into the text surface.
+        """
+        first = self.buffer.line_of(pos)
+        touched = self.buffer.line_of(pos + count) - first + 1
+        self.buffer.delete(pos, count)
+        self.buffer.insert(pos, text)
+
+        lines = [self.buffer.line(n) for n in range(first, first + text.count('\n') + 1)]
+        self.advances[first:first + touched] = [AdvanceIndex(line, self.font) for line in lines]
+        wrapped = [wrap_text(line, self.font, self.rect.width) for line in lines]
+        self.starts[first:first + touched] = [line_starts(line, pieces) for line, pieces in zip(lines, wrapped)]
+        self.replace_paragraphs(first, touched, wrapped)
+        self.version += 1
+        self.mark_dirty()
+
+    def replace_paragraphs(self, first, count, wrapped):
+        """replace count paragraphs starting at first with newly wrapped ones, and render the changes"""
+        old_lines = list(chain(*self.paragraphs[first:first + count]))
+        new_lines = list(chain(*wrapped))
+        self.paragraphs[first:first + count] = wrapped
+
+        #find the first line of the changed paragraphs. Stop looking once it's out of sight
+        visible = self.visible_lines()
+        line = 0
+        for paragraph in islice(self.paragraphs, first):
+            line += len(paragraph)
+            if line >= visible:
+                return
+
+        if len(old_lines) == len(new_lines):
+            for n, (old, new) in enumerate(zip(old_lines, new_lines), line):
+                if old != new and n < visible:
+                    self.render_line(n, new)
+        else:
+            #lines moved up or down, render everything below the change
+            lines = self.lines_from(first)
+            for n in range(line, visible):
+                self.render_line(n, next(lines, ''))
+
+    def locate(self, pos):
+        """return the (row, x) of a cursor in front of character pos
+
+        row is the number of the wrapped line the cursor is on, counting from the top, and x
+        is relative to the start of that wrapped line.
+        """
+        n = self.buffer.line_of(pos)
+        column = pos - self.buffer.line_start(n)
+        starts = self.starts[n]
+        k = bisect.bisect_right(starts, column) - 1
+        #whitespace dropped at a line break puts the cursor at the end of the wrapped line
+        column = min(column, starts[k] + len(self.paragraphs[n][k]))
+        x = self.advances[n].x(column) - self.advances[n].x(starts[k])
+        row = sum(len(paragraph) for paragraph in islice(self.paragraphs, n)) + k
+        return row, x
+
+    def locate_cursor(self):
+        """return locate(cursor_pos), which is only worked out again when the cursor or the text changed
+
+        the cursor is drawn every frame while it blinks, and finding its row takes longer the more
+        lines come before it.
+        """
+        key = self.cursor_pos, self.version
+        if self.caret is None or self.caret[0] != key:
+            self.caret = key, self.locate(self.cursor_pos)
+        return self.caret[1]
+
+    def position_at(self, x, y):
+        """return the cursor position for a click at (x, y), relative to the top left of the text
+
+        the wrapped line that was clicked is found first, then the character on it.
+        """
+        row = max(0, y // self.font.get_linesize())
+        for n, paragraph in enumerate(self.paragraphs):
+            if row < len(paragraph):
                 break
-            s = self.font.render(line, True, self.style['font_color'])
-            self.img.blit(s, (self.style['padding'], self.style['padding'] + n * (self.font.get_linesize())))
+            row -= len(paragraph)
+        else:
+            #below the last line
+            row = len(paragraph) - 1
+        start = self.starts[n][row]
+        index = self.advances[n]
+        column = index.find(index.x(start) + x, start, start + len(paragraph[row]))
+        return self.buffer.line_start(n) + column
+
+    def lines_from(self, paragraph):
+        """iterate over the wrapped lines, starting at the first line of a paragraph"""
+        return chain.from_iterable(islice(self.paragraphs, paragraph, None))
+
+    def visible_lines(self):
+        """the number of lines that (partly) fit inside the TextCtrl"""
+        return self.rect.height // self.font.get_linesize() + 1
+
+    def render_line(self, n, line):
+        """render a single line of text onto the text surface, replacing what was there"""
+        linesize = self.font.get_linesize()
+        y = self.style.padding + n * linesize
+        self.img.fill((0, 0, 0, 0), (0, y, self.rect.width, linesize))
+        if line:
+            s = goo.font.render(self.font, line, True, self.style.font_color)
+            self.img.blit(s, (self.style.padding, y))
 
     @gunge.event.bind(gunge.event.UPDATE)
     def update(self, event):
         """update TextCtrl"""
         base.Control.update(self, event)
+        if self.cursor_pos is None:
+            return
         self.blink_count += 1
         if self.blink_count > 14:
             self.cursor_blink = not self.cursor_blink
             self.blink_count = 0
 
-    @gunge.event.bind(gunge.event.RENDER)
     def render(self, event):
         """render TextCtrl"""
         surface = event.display.screen
-        goo.draw.rounded_rect(surface, self.rect, (self.style["background_color"], 0, self.style["border_radius"], self.style["border_rounding"]))
+        goo.draw.rounded_rect(surface, self.rect, (self.style.background_color, 0, self.style.border_radius, self.style.border_rounding))
         goo.draw.rounded_rect(surface, self.rect, self.style)
         if self.cursor_pos is not None and self.cursor_blink:
-            x = self.rect.left + self.style["padding"] + self.font.size(self.text[:self.cursor_pos])[0]
-            y = self.rect.centery
-            pygame.draw.line(surface, (0,0,0), (x, y + self.font.get_linesize() // 2), (x, y - self.font.get_linesize() // 2))
+            row, x = self.locate_cursor()
+            if row < self.visible_lines():
+                linesize = self.font.get_linesize()
+                x += self.rect.left + self.style.padding
+                y = self.rect.top + self.style.padding + row * linesize
+                pygame.draw.line(surface, (0,0,0), (x, y), (x, y + linesize - 1))
         base.Control.render(self, event)
 
 
@@ -143,42 +305,123 @@ def wrap_text(text, font, maxwidth):
     given a string with a specific pygame font object and a maximum width, return a list of strings that
     are as long as possible without exceeding the maximum length. Breaks up at whitespace if possible,
     otherwise starts breaking up words themselves.
+
+    the text is laid out in a single pass. Each word is measured only once, and the widths are
+    remembered for the font (see goo.font.Metrics), so repeated words are not measured again.
     """
-    text = text.lstrip()
-    if font.size(text)[0] <= maxwidth:
-        return [text]
-    else:
-        orig_text = text
-        while font.size(text)[0] > maxwidth:
-            split = text.rsplit(None, 1)[0]
+    measure = goo.font.metrics(font).width
+    lines = []
+    line, width, space = [], 0, None
+    for word in WORD_RE.findall(text):
+        if word[0].isspace():
+            space = word
+            continue
+
+        word_width = measure(word)
+        if line:
+            space_width = measure(space)
+            if width + space_width + word_width <= maxwidth:
+                line.append(space)
+                line.append(word)
+                width += space_width + word_width
+                continue
+            lines.append(''.join(line))
+
+        if word_width > maxwidth:
             #start cutting words if splitting at whitespace doesn't cut it (pardon pun)
-            text = split[:-1] if split == text else split
-        return [text] + wrap_text(orig_text[len(text):], font, maxwidth)
+            pieces, word_width = break_word(word, measure, maxwidth)
+            lines.extend(pieces[:-1])
+            word = pieces[-1]
+        line, width = [word], word_width
+
+    lines.append(''.join(line))
+    return lines
+
+def break_word(word, measure, maxwidth):
+    """break up a word that is wider than maxwidth at glyph boundaries
+
+    returns the list of pieces and the width of the last piece. Every piece holds
+    at least one glyph, even if that glyph is wider than maxwidth.
+    """
+    def fit(start, end):
+        #the glyphs drawn together can be wider than their advances added up, so measure the
+        #actual piece and give back glyphs until it fits
+        while end - start > 1 and measure(word[start:end]) > maxwidth:
+            end -= 1
+        return end
+
+    pieces, start, width = [], 0, 0
+    for i, char in enumerate(word):
+        advance = measure(char)
+        if width + advance > maxwidth and i > start:
+            end = fit(start, i)
+            pieces.append(word[start:end])
+            start, width = end, measure(word[end:i])
+        width += advance
+    while len(word) - start > 1 and measure(word[start:]) > maxwidth:
+        end = fit(start, len(word))
+        pieces.append(word[start:end])
+        start = end
+    pieces.append(word[start:])
+    return pieces, measure(word[start:])
 
 def wrap_multiline(text, font, maxwidth):
     """wrap multiline text
 
     same as wrap_text, but split up at line boundaries first.
     """
-    return list(chain(*(wrap_text(line, font, maxwidth) for line in text.splitlines())))
+    lines = []
+    for line in text.splitlines():
+        lines.extend(wrap_text(line, font, maxwidth))
+    return lines
+
+def line_starts(text, lines):
+    """return the position in text where each of its wrapped lines (see wrap_text) starts
+
+    every wrapped line is a piece of the text, in order. Whitespace at the breaks is left out.
+    """
+    starts, offset = [], 0
+    for line in lines:
+        offset = text.find(line, offset)
+        starts.append(offset)
+        offset += len(line)
+    return starts
 
 def find_cursorpos(cursor_x, text, font):
-    """binary search for the position of the cursor"""
-    if cursor_x >= font.size(text)[0]:
-        return len(text) - 1
-    if cursor_x <= 0:
-        return -1
-
-    half = len(text) // 2
-    n = int(round(half / 2.))
-    while 1:
-        char_start = font.size(text[:half])[0]
-        char_end = font.size(text[:half + 1])[0]
-        if char_start < cursor_x <= char_end or len(text) == 1:
-            return half
-        elif cursor_x > char_end:
-            half += n
-            n = int(round(n / 2.))
-        elif cursor_x <= char_start:
-            half -= n
-            n = int(round(n / 2.))
+    """binary search for the position of the cursor
+
+    returns the index of the character the cursor ends up behind, or -1 for the start of the text.
+    TextCtrl keeps an AdvanceIndex around instead of calling this for every click.
+    """
+    return AdvanceIndex(text, font).find(cursor_x) - 1
+
+
+class AdvanceIndex(object):
+    """the cumulative glyph advances of a line of text
+
+    offsets[i] is the x position of a cursor placed in front of character i, so the last offset
+    is the width of the entire line. Neither placing the cursor nor finding the cursor position
+    for a click measures any text. TextCtrl keeps one index per line, and builds the index of a
+    line again when it is edited.
+    """
+
+    def __init__(self, text, font):
+        """build the index for text rendered with font"""
+        advance = goo.font.metrics(font).advance
+        x, self.offsets = 0, [0]
+        for char in text:
+            x += advance(char)
+            self.offsets.append(x)
+
+    def x(self, pos):
+        """the x position of a cursor in front of character pos, relative to the start of the text"""
+        return self.offsets[pos]
+
+    def find(self, x, start=0, end=None):
+        """the cursor position for a click at x: behind the character that was clicked on
+
+        the result lies between start and end, which default to the whole line.
+        """
+        if end is None:
+            end = len(self.offsets) - 1
+        return min(bisect.bisect_left(self.offsets, x, start, end), end)
@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+
+"""textbuffer - storage for the text inside editable text controls
+
+a text buffer holds a piece of text and knows where its lines (separated by newlines) start.
+All buffers have the same interface, so TextCtrl can use whichever is best for the job:
+
+    len(buffer)               number of characters
+    buffer.text               the whole text as a string
+    buffer.insert(pos, text)  insert text in front of character pos
+    buffer.delete(pos, count) delete count characters starting at pos
+    buffer.slice(start, end)  the text between two positions
+    buffer.line_count()       the number of lines
+    buffer.line_start(n)      the position of the first character of line n
+    buffer.line_of(pos)       the number of the line character pos is on
+    buffer.line(n)            the text of line n, without the newline
+"""
+
+import bisect
+
+
+class StringBuffer(object):
+    """the simplest text buffer: a plain string. Every edit copies the entire text"""
+
+    def __init__(self, text=u''):
+        self.text = text
+
+    def __len__(self):
+        return len(self.text)
+
+    def insert(self, pos, text):
+        """insert text in front of character pos"""
+        self.text = ''.join((self.text[:pos], text, self.text[pos:]))
+
+    def delete(self, pos, count):
+        """delete count characters, starting at pos"""
+        self.text = self.text[:pos] + self.text[pos + count:]
+
+    def slice(self, start, end):
+        """return the text between start and end"""
+        return self.text[start:end]
+
+    def line_count(self):
+        """the number of lines in the text"""
+        return self.text.count('\n') + 1
+
+    def line_of(self, pos):
+        """the number of the line character pos is on"""
+        return self.text.count('\n', 0, pos)
+
+    def line_start(self, n):
+        """the position of the first character of line n"""
+        start = 0
+        for i in range(n):
+            start = self.text.index('\n', start) + 1
+        return start
+
+    def line(self, n):
+        """the text of line n, without the newline"""
+        return self.text.split('\n')[n]
+
+
+class GapBuffer(object):
+    """a gap buffer. Edits close to the previous edit are cheap, no matter how long the text is
+
+    the text is kept in two lists of characters: the characters in front of the gap, and the
+    characters behind it in reverse order. Inserting or deleting at the gap only touches the ends
+    of these lists, and moving the gap costs time proportional to the distance it moves. Since
+    typing mostly happens in one spot, that distance is usually small.
+
+    the positions of the newlines are stored the same way. Newlines in front of the gap are stored
+    as positions in the text, newlines behind the gap as distances from the end of the text, so
+    edits at the gap never have to update them. This keeps line lookups cheap as well.
+    """
+
+    def __init__(self, text=u''):
+        self.before = list(text)
+        self.after = []
+        self.before_lines = [i for i, char in enumerate(text) if char == '\n']
+        self.after_lines = []
+        self._text = text
+
+    def __len__(self):
+        return len(self.before) + len(self.after)
+
+    def get_text(self):
+        """return the entire text. The string is remembered until the next edit"""
+        if self._text is None:
+            self._text = ''.join(self.before) + ''.join(reversed(self.after))
+        return self._text
+
+    text = property(get_text, doc="The entire text in the buffer, as a string")
+
+    def move_gap(self, pos):
+        """move the gap in front of character pos"""
+        gap, length = len(self.before), len(self)
+        if pos < gap:
+            moved = self.before[pos:]
+            del self.before[pos:]
+            self.after.extend(reversed(moved))
+
+            i = bisect.bisect_left(self.before_lines, pos)
+            lines = self.before_lines[i:]
+            del self.before_lines[i:]
+            self.after_lines.extend(length - line for line in reversed(lines))
+        elif pos > gap:
+            start = len(self.after) - (pos - gap)
+            moved = self.after[start:]
+            del self.after[start:]
+            self.before.extend(reversed(moved))
+
+            i = bisect.bisect_right(self.after_lines, length - pos)
+            lines = self.after_lines[i:]
+            del self.after_lines[i:]
+            self.before_lines.extend(length - line for line in reversed(lines))
+
+    def insert(self, pos, text):
+        """insert text in front of character pos"""
+        self.move_gap(pos)
+        for i, char in enumerate(text):
+            if char == '\n':
+                self.before_lines.append(pos + i)
+        self.before.extend(text)
+        self._text = None
+
+    def delete(self, pos, count):
+        """delete count characters, starting at pos"""
+        self.move_gap(pos)
+        length = len(self)
+        del self.after[len(self.after) - count:]
+        del self.after_lines[bisect.bisect_right(self.after_lines, length - pos - count):]
+        self._text = None
+
+    def slice(self, start, end):
+        """return the text between start and end, without building the entire text"""
+        gap = len(self.before)
+        parts = []
+        if start < gap:
+            parts.append(''.join(self.before[start:min(end, gap)]))
+        if end > gap:
+            n = len(self.after)
+            parts.append(''.join(reversed(self.after[n - (end - gap):n - max(start - gap, 0)])))
+        return ''.join(parts)
+
+    def line_count(self):
+        """the number of lines in the text"""
+        return len(self.before_lines) + len(self.after_lines) + 1
+
+    def newline(self, n):
+        """the position of newline number n"""
+        if n < len(self.before_lines):
+            return self.before_lines[n]
+        return len(self) - self.after_lines[len(self.before_lines) - n - 1]
+
+    def line_of(self, pos):
+        """the number of the line character pos is on"""
+        if pos <= len(self.before):
+            return bisect.bisect_left(self.before_lines, pos)
+        after = len(self.after_lines) - bisect.bisect_right(self.after_lines, len(self) - pos)
+        return len(self.before_lines) + after
+
+    def line_start(self, n):
+        """the position of the first character of line n"""
+        return self.newline(n - 1) + 1 if n > 0 else 0
+
+    def line(self, n):
+        """the text of line n, without the newline"""
+        start = self.line_start(n)
+        end = self.newline(n) if n < self.line_count() - 1 else len(self)
+        return self.slice(start, end)
@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+
+"""damage.py - dirty rectangle tracking
+
+when damage tracking is enabled, elements mark the screen area they occupy as damaged whenever
+their state changes. Each frame the damage is merged into a list of rectangles, and only elements
+intersecting those rectangles are drawn (clipped to them). Pass the rectangles to
+pygame.display.update to only update the changed parts of the screen.
+
+goo does not know what is behind the GUI, so the application must restore the background in the
+damaged areas before goo renders. Calling collect() before the RENDER event gives you the list for
+the coming frame; if you don't call it, goo collects the damage itself on the first RENDER.
+"""
+
+import pygame
+
+enabled = False
+
+# elements marked dirty since the damage was last collected
+pending = set()
+# rectangles damaged since the damage was last collected
+damaged = []
+# the merged damage rectangles of the current frame
+rects = []
+
+_frame = None
+_collected = False
+
+
+def enable():
+    """start tracking damage. Everything currently on screen should be redrawn once by the caller"""
+    global enabled
+    enabled = True
+
+def disable():
+    """stop tracking damage, every element is drawn on every frame again"""
+    global enabled, rects
+    enabled = False
+    pending.clear()
+    del damaged[:]
+    rects = []
+
+def add(rect):
+    """mark an area of the screen as damaged"""
+    if enabled:
+        damaged.append(pygame.Rect(rect))
+
+def mark(element):
+    """mark an element as dirty
+
+    the area the element occupies now is damaged right away, and the area it occupies when
+    the damage is collected is damaged as well. This makes sure that moved elements are
+    erased at their old position.
+    """
+    if enabled:
+        if hasattr(element, 'rect'):
+            damaged.append(element.damage_rect())
+        pending.add(element)
+
+def collect():
+    """merge all damage since the last call into the rectangles for the coming frame
+
+    returns the list of rectangles, which is also available through get_rects.
+    """
+    global rects, _collected
+    for element in pending:
+        damaged.append(element.damage_rect())
+    pending.clear()
+    rects = merge(damaged)
+    del damaged[:]
+    _collected = True
+    return rects
+
+def begin_frame(event):
+    """make sure the damage for this RENDER event is collected. Called by the elements"""
+    global _frame, _collected
+    if event is not _frame:
+        _frame = event
+        if not _collected:
+            collect()
+        _collected = False
+
+def get_rects():
+    """return the damage rectangles of the current frame, for use with pygame.display.update"""
+    return list(rects)
+
+def merge(rect_list):
+    """merge a list of rectangles so that none of the resulting rectangles overlap"""
+    merged = []
+    for rect in rect_list:
+        if not rect.width or not rect.height:
+            continue
+        rect = pygame.Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
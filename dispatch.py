@@ -0,0 +1,157 @@
+#! /usr/bin/env python
+
+"""dispatch.py - routing of mouse events to elements
+
+instead of every element binding its own mouse handlers and testing every event against its
+rect, goo binds the mouse events once. The elements that handle mouse events are kept in a
+spatial index, and each event is routed to the topmost element under the pointer that has a
+handler for it:
+
+    on_mousedown(event)  left mouse button pressed on the element
+    on_mouseup(event)    left mouse button released on the element, or anywhere if the element
+                         received the mousedown before it (so it can cancel a click or a drag)
+    on_motion(event)     mouse moved over the element, or anywhere while the element has the
+                         mouse captured (from mousedown until mouseup)
+    on_blur()            the mouse was pressed outside the element after it was clicked
+    on_enter()           the mouse moved onto the element
+    on_leave()           the mouse moved off the element
+    on_scroll(lines)     the mouse wheel was turned over the element, by lines (negative is up)
+
+topmost means the element created last, which is also the one drawn last. Hovering is resolved
+once per frame: the pointer position is read once, nothing happens if neither the pointer nor
+the index changed, and only the elements that the mouse entered or left are notified.
+"""
+
+import pygame
+import gunge.event, gunge.sprite
+import goo.element, goo.spatial
+
+# the handler methods that make an element show up in the index
+HANDLERS = ('on_mousedown', 'on_mouseup', 'on_motion', 'on_enter', 'on_scroll')
+
+# the index of all elements that handle mouse events
+index = goo.spatial.GridIndex()
+
+_dispatcher = None
+
+
+class Dispatcher(gunge.sprite.Sprite):
+    """a sprite without an image, binding the mouse events for all of goo"""
+
+    def __init__(self):
+        gunge.sprite.Sprite.__init__(self)
+        self.captured = None
+        self.focus = None
+        self.hovered = None
+        self.mouse_pos = None
+        self.index_version = None
+
+    def find(self, pos, handler):
+        """return the topmost visible element at pos having a certain handler method, or None"""
+        best = None
+        for element in index.at(pos):
+            if getattr(element, 'hidden', False) or not hasattr(element, handler):
+                continue
+            if best is None or element.serial > best.serial:
+                best = element
+        return best
+
+    @gunge.event.bind(pygame.MOUSEBUTTONDOWN, {'button': 1})
+    def on_mousedown(self, event):
+        """send the mousedown to the element under the pointer, and capture the mouse for it"""
+        target = self.find(event.pos, 'on_mousedown')
+        if self.focus is not None and self.focus is not target and hasattr(self.focus, 'on_blur'):
+            self.focus.on_blur()
+        self.focus = self.captured = target
+        if target is not None:
+            return target.on_mousedown(event)
+
+    @gunge.event.bind(pygame.MOUSEBUTTONUP, {'button': 1})
+    def on_mouseup(self, event):
+        """send the mouseup to the element under the pointer and to the element that captured the mouse"""
+        target = self.find(event.pos, 'on_mouseup')
+        captured, self.captured = self.captured, None
+        if captured is not None and captured is not target and hasattr(captured, 'on_mouseup'):
+            captured.on_mouseup(event)
+        if target is not None:
+            return target.on_mouseup(event)
+
+    @gunge.event.bind(pygame.MOUSEMOTION)
+    def on_motion(self, event):
+        """send the motion to the element that captured the mouse, or else to the element under the pointer"""
+        target = self.captured
+        if target is None or not hasattr(target, 'on_motion'):
+            target = self.find(event.pos, 'on_motion')
+        if target is not None:
+            return target.on_motion(event)
+
+    @gunge.event.bind(pygame.MOUSEBUTTONDOWN, {'button': lambda button: button in (4, 5)})
+    def on_scroll(self, event):
+        """send mouse wheel movement to the element under the pointer"""
+        target = self.find(event.pos, 'on_scroll')
+        if target is not None:
+            return target.on_scroll(-1 if event.button == 4 else 1)
+
+    def forget(self, element):
+        """stop routing events to an element that is going away"""
+        if self.captured is element:
+            self.captured = None
+        if self.focus is element:
+            self.focus = None
+        if self.hovered is element:
+            self.hovered = None
+
+    @gunge.event.bind(gunge.event.UPDATE)
+    def update(self, event):
+        """lay out changed elements again, then find the element the mouse is hovering over
+
+        relayout runs first, so hover is resolved against the new layout.
+        """
+        goo.element.relayout()
+        pos = pygame.mouse.get_pos()
+        if pos == self.mouse_pos and index.version == self.index_version:
+            return
+        self.mouse_pos, self.index_version = pos, index.version
+
+        target = self.find(pos, 'on_enter')
+        if target is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.on_leave()
+            self.hovered = target
+            if target is not None:
+                target.on_enter()
+
+    def render(self, event):
+        """the dispatcher has nothing to render"""
+        pass
+
+
+def get():
+    """return the dispatcher, creating it the first time"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = Dispatcher()
+    return _dispatcher
+
+def is_interactive(element):
+    """True if an element has any of the mouse handlers"""
+    for handler in HANDLERS:
+        if hasattr(element, handler):
+            return True
+    return False
+
+def track(element):
+    """add an element to the index, or update its rect in there"""
+    get()
+    index.update(element)
+
+def retrack(element):
+    """an element was hidden or shown, resolve hovering again in the next frame"""
+    if element in index:
+        index.touch()
+
+def untrack(element):
+    """remove an element from the index, no more events are routed to it"""
+    index.remove(element)
+    if _dispatcher is not None:
+        _dispatcher.forget(element)
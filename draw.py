@@ -1,9 +1,95 @@
 #! /usr/bin/env python
 
-"""draw functions used to draw the controls"""
+"""draw functions used to draw the controls
+
+the decorations drawn by circle and rounded_rect are rasterized once and then kept in a
+SurfaceCache, so drawing the same decoration again is only a single blit.
+"""
 
 import pygame, goo
 import math
+from collections import OrderedDict
+
+# default amount of memory the decoration cache may use, in bytes
+DEFAULT_BUDGET = 8 * 1024 * 1024
+
+
+class SurfaceCache(object):
+    """A bounded least-recently-used cache of pre-rendered surfaces
+
+    surfaces are stored under a hashable key. The cache keeps the combined size of all stored
+    surfaces below its byte budget by throwing out the least recently used surfaces first.
+    hits, misses and evictions are counted so that the budget can be tuned.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        """create an empty cache that may hold up to budget bytes of surface data"""
+        self.budget = budget
+        self.surfaces = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, factory):
+        """return the surface stored under key
+
+        if the key is not present, factory is called without arguments to create the surface,
+        which is then stored in the cache. Surfaces returned are shared, so don't draw on them.
+        """
+        try:
+            surface = self.surfaces.pop(key)
+        except KeyError:
+            self.misses += 1
+            surface = factory()
+            self.add(key, surface)
+        else:
+            self.hits += 1
+            self.surfaces[key] = surface
+        return surface
+
+    def add(self, key, surface):
+        """store a surface in the cache, evicting old surfaces to make room for it
+
+        surfaces bigger than the entire budget are not stored at all.
+        """
+        nbytes = surface_bytes(surface)
+        if nbytes > self.budget:
+            return
+        if key in self.surfaces:
+            self.size -= surface_bytes(self.surfaces.pop(key))
+        self.surfaces[key] = surface
+        self.size += nbytes
+        self.shrink(self.budget)
+
+    def shrink(self, budget):
+        """evict least recently used surfaces until the cache takes up no more than budget bytes"""
+        while self.size > budget:
+            key, surface = self.surfaces.popitem(last=False)
+            self.size -= surface_bytes(surface)
+            self.evictions += 1
+
+    def set_budget(self, budget):
+        """change the byte budget of the cache, evicting surfaces if necessary"""
+        self.budget = budget
+        self.shrink(budget)
+
+    def clear(self):
+        """remove all surfaces from the cache. The counters are left alone"""
+        self.surfaces.clear()
+        self.size = 0
+
+    def stats(self):
+        """return a dictionary with the cache counters and current memory usage"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.surfaces), 'bytes': self.size, 'budget': self.budget}
+
+
+def surface_bytes(surface):
+    """the amount of memory taken up by the pixels of a surface"""
+    return surface.get_pitch() * surface.get_height()
+
+# the cache used for all decorations drawn by this module
+cache = SurfaceCache()
+
 
 def alpha_surface(*args):
     """return a transparent surface
@@ -21,6 +107,12 @@ def circle(target_surf, color, pos, radius, width=0):
 
     drawing a circle with a width other than zero has weird results. Therefore this alternate method
     """
+    color = tuple(color)
+    s = cache.get(('circle', color, width, radius), lambda: make_circle(color, radius, width))
+    target_surf.blit(s, (pos[0] - radius, pos[1] - radius))
+
+def make_circle(color, radius, width):
+    """rasterize the surface blitted by circle"""
     alpha = color[3] if len(color) == 4 else 255
     colorkey = (0, 0, 0) if color[:3] != (0, 0, 0) else (255, 255, 255)
     s = pygame.Surface((radius*2+2, radius*2+2))
@@ -31,24 +123,36 @@ def circle(target_surf, color, pos, radius, width=0):
 
     s.set_colorkey(colorkey)
     s.set_alpha(alpha)
-    target_surf.blit(s, (pos[0] - radius, pos[1] - radius))
+    return s
 
 def rounded_rect(target_surf, rect, style):
     """draw a rounded rectangle
 
-    the style argument can be either a tuple in the form of (color, width, radius) or a goo Style object 
+    the style argument can be either a tuple in the form of (color, width, radius), a resolved goo style,
+    or a goo.style.Style that has been registered
     """
-    #select best possible draw function
     if isinstance(style, goo.style.Style):
-        color, width, radius, rounding = style['border_color'], style['border_width'], style['border_radius'], style['border_rounding']
+        if goo.style.style_dict.get(style.name) is not style:
+            raise TypeError("style '%s' is not registered, pass a resolved style or a tuple instead" % style.name)
+        style = goo.style.get(style.name)
+    #select best possible draw function
+    if isinstance(style, goo.style.ResolvedStyle):
+        color, width, radius, rounding = style.border_color, style.border_width, style.border_radius, style.border_rounding
     elif len(style) == 3:
         (color, width, radius), rounding = style, goo.ALL
     else:
         color, width, radius, rounding = style
+    color, size = tuple(color), tuple(rect.size)
+    surf = cache.get(('rounded_rect', size, color, width, radius, rounding),
+                     lambda: make_rounded_rect(size, color, width, radius, rounding))
+    target_surf.blit(surf, rect)
+
+def make_rounded_rect(size, color, width, radius, rounding):
+    """rasterize the surface blitted by rounded_rect"""
     draw_circle = pygame.draw.circle if width <= 1 else circle
     alpha = color[3] if len(color) == 4 else 255 
     colorkey = (0,0,0) if color[:3] != (0,0,0) else (255, 255, 255)
-    r = rect
+    r = pygame.Rect((0, 0), size)
 
     #prepare the circle
     circ = pygame.Surface((radius*2, radius*2))
@@ -74,4 +178,4 @@ def rounded_rect(target_surf, rect, style):
 
     surf.set_colorkey(colorkey)
     surf.set_alpha(alpha)
-    target_surf.blit(surf, rect)
+    return surf
@@ -5,11 +5,52 @@
 import gunge
 import goo
 import pygame
+import itertools
+
+# gives every element a serial number, used to find the topmost element
+_serials = itertools.count()
+
+# elements whose layout was invalidated since the last relayout
+_invalid = set()
+
+
+def state_property(name, doc=None):
+    """create a property for element state that marks the element dirty when it changes
+
+    the value is stored in the instance under '_' + name. Setting the property for the first
+    time (usually in __init__) does not mark the element dirty.
+    """
+    attr = '_' + name
+
+    def get_state(self):
+        return getattr(self, attr)
+
+    def set_state(self, value):
+        changed = attr in self.__dict__ and self.__dict__[attr] != value
+        self.__dict__[attr] = value
+        if changed:
+            self.mark_dirty()
+
+    return property(get_state, set_state, doc=doc)
 
 
 class Element(gunge.sprite.Sprite):
     """Element - the base class for all GUI elements"""
 
+    # containers set this if they render their subtree into an offscreen surface
+    cached = False
+
+    # true for elements that are made with the nodes of their children (see goo.parser.register)
+    takes_children = False
+
+    # the style options that create and arrange use. When one of them changes, the element is
+    # created again, other changes only draw it again (see restyle). None stands for all options
+    style_options = None
+
+    # true after hide was called on the element itself, rather than on one of its ancestors.
+    # Showing an ancestor again leaves such elements hidden
+    hidden_explicitly = False
+
     def __init__(self, parent, **attributes):
         """Initialize element."""
         gunge.sprite.Sprite.__init__(self)
@@ -19,9 +60,16 @@ class Element(gunge.sprite.Sprite):
 
         self.parent = parent
         self.attributes = attributes
-        self.style = goo.style.get(attributes.get('style', "default"))
+        self.style = goo.style.use(self, attributes.get('style', "default"))
         self.id = attributes.get('id', None)
+        self.directives = self.compile_directives()
         self.handlers = {}
+        self.measured = None
+        self.area = None
+        self.serial = next(_serials)
+        self.interactive = goo.dispatch.is_interactive(self)
+        self.dirty = True
+        goo.damage.mark(self)
 
     def bind_handler(self, eventtype, handlerfunc, attr_filter=None):
         """bind event handlers to this element. This method is for the goo-specific way of handling events"""
@@ -71,6 +119,69 @@ class Element(gunge.sprite.Sprite):
         height = int(self.attributes.get("height", 0))
         self.rect = pygame.Rect(0, 0, width, height)
 
+    def measure(self):
+        """return the size the element needs, as a (width, height) tuple
+
+        this is the size of the rect made by create, before arranging (which may make the element
+        larger, see goo.style.expand). The result is remembered, so measuring again is cheap.
+        """
+        if self.measured is None:
+            self.measured = tuple(self.rect.size)
+        return self.measured
+
+    def remeasure(self):
+        """create the element again and return its new size (see measure)
+
+        called by relayout for elements whose layout was invalidated.
+        """
+        self.create()
+        self.measured = None
+        return self.measure()
+
+    def invalidate_layout(self):
+        """mark the layout of this element as invalid
+
+        call this when something the size of the element depends on changes. The next call to
+        relayout (made once per frame by goo.dispatch) creates the element again and arranges it.
+        """
+        _invalid.add(self)
+        goo.dispatch.get()
+
+    def set_attribute(self, name, value):
+        """change an attribute of the element, and update the layout to match"""
+        self.attributes[name] = value
+        self.directives = self.compile_directives()
+        self.invalidate_layout()
+
+    def set_style(self, name):
+        """change the style of the element to the registered style called name"""
+        self.attributes['style'] = name
+        self.style = goo.style.use(self, name)
+        self.invalidate_layout()
+
+    def restyle(self, style, changed):
+        """switch to a new version of the style of the element. Called by goo.style.update
+
+        changed is the set of options that have a different value. The element is created again
+        in the next frame if it depends on one of them (see style_options), and drawn again otherwise.
+        """
+        self.style = style
+        if not changed:
+            return
+        if self.style_options is None or changed & self.style_options:
+            self.invalidate_layout()
+        else:
+            self.mark_dirty()
+
+    def compile_directives(self):
+        """return the layout directives for the attributes of this element
+
+        the result is a tuple of (directive, argument) pairs, in the order the directives were
+        registered (see goo.style.directive). arrange calls them in turn.
+        """
+        attributes = self.attributes
+        return tuple((func, attributes[name]) for name, func in goo.style.directives.iteritems() if name in attributes)
+
     def arrange(self, area):
         """arranges the element inside its parent
 
@@ -78,19 +189,118 @@ class Element(gunge.sprite.Sprite):
         be returned, so that the parent can place other elements correctly. Note that the position of the area rectangle
         is relative to the parent, so basically what must be returned after arranging is pygame.Rect(self.pos, self.rect.size)
         """
+        self.area = pygame.Rect(area)
         self.pos = area.topleft
-        for attr, arg in self.attributes.items():
-            try:
-                getattr(goo.style, attr)(self, area, arg)
-            except AttributeError:
-                continue
+        for directive, arg in self.directives:
+            directive(self, area, arg)
+        #directives such as expand may resize the element after set_pos indexed it
+        self.reindex()
         return pygame.Rect(self.pos, self.rect.size)
 
-    @gunge.event.bind(gunge.event.UPDATE)
-    def update(self, event):
-        """update element (recalculate absolute position if parent has moved)"""
-        self.rect.topleft = self.get_absolutepos()
-        gunge.sprite.Sprite.update(self, event)
+    def mark_dirty(self):
+        """mark the element as changed, so that it is drawn again
+
+        any caching ancestors are marked stale, which makes them rasterize their
+        offscreen surface again the next time they are rendered.
+        """
+        self.dirty = True
+        goo.damage.mark(self)
+        parent = self.parent
+        while not isinstance(parent, goo.NullParent):
+            if parent.cached:
+                if parent.stale:
+                    break
+                parent.stale = True
+            parent = parent.parent
+
+    def get_cacheroot(self):
+        """return the nearest ancestor rendering this element into its offscreen surface, or None"""
+        parent = self.parent
+        while not isinstance(parent, goo.NullParent):
+            if parent.cached:
+                return parent
+            parent = parent.parent
+        return None
+
+    def damage_rect(self):
+        """the area of the screen the element draws on. Override if you draw outside self.rect"""
+        return pygame.Rect(self.rect)
+
+    @gunge.event.bind(gunge.event.RENDER)
+    def on_render(self, event):
+        """draw the element, unless a caching ancestor draws it into its offscreen surface
+
+        with damage tracking enabled (see goo.damage), the element is only drawn inside the
+        damaged areas it intersects, and skipped entirely if there are none.
+        """
+        if self.hidden or self.get_cacheroot() is not None:
+            return
+        if not goo.damage.enabled:
+            self.draw(event)
+            return
+
+        goo.damage.begin_frame(event)
+        area = self.damage_rect()
+        screen = event.display.screen
+        clip = screen.get_clip()
+        for rect in goo.damage.rects:
+            if area.colliderect(rect):
+                screen.set_clip(rect.clip(clip))
+                self.draw(event)
+        screen.set_clip(clip)
+
+    def draw(self, event):
+        """draw the element onto event.display.screen"""
+        self.render(event)
+        self.dirty = False
+
+    def draw_subtree(self, event):
+        """draw the element and everything inside it. For plain elements this is just draw"""
+        if not self.hidden:
+            self.draw(event)
+
+    def show(self):
+        """make the element visible, and let it receive mouse events again"""
+        self.hidden_explicitly = False
+        self.set_hidden(False)
+
+    def hide(self):
+        """hide the element. Hidden elements are not drawn and receive no mouse events"""
+        self.hidden_explicitly = True
+        self.set_hidden(True)
+
+    def set_hidden(self, hidden):
+        """hide or show the element. Used by show and hide"""
+        self.hidden = hidden
+        self.mark_dirty()
+        if self.interactive:
+            goo.dispatch.retrack(self)
+
+    def kill(self):
+        """stop the element from receiving events and remove it from its parent"""
+        self.mark_dirty()
+        siblings = getattr(self.parent, 'children', None)
+        if siblings is not None and self in siblings:
+            siblings.remove(self)
+            self.parent.invalidate_layout()
+        _invalid.discard(self)
+        goo.style.release(self)
+        if self.interactive:
+            goo.dispatch.untrack(self)
+        gunge.sprite.Sprite.kill(self)
+
+    def place(self):
+        """called after the absolute position of the element changed
+
+        positions are not checked every frame. Instead, setting pos calls this, and containers
+        pass it on to their children (see Container.place).
+        """
+        self.reindex()
+
+    def reindex(self):
+        """update the element in the mouse event index after its rect changed"""
+        if self.interactive:
+            goo.dispatch.track(self)
 
     def get_absolutepos(self):
         """get elements' absolute position
@@ -120,6 +330,13 @@ class Element(gunge.sprite.Sprite):
         #test if this new position is within the parent
         parent_rect = self.parent.rect
         new_rect = pygame.Rect((x + parent_rect.left, y + parent_rect.top), self.rect.size)
+        #arranging again often places elements where they already are
+        if new_rect == self.rect and getattr(self, '_pos', None) == (x, y):
+            return
+
+        #erase the element at its old position
+        self.mark_dirty()
+
         #perform a boundary check, unless the parent size is 0 (meaning uninitialized)
         if parent_rect.size != (0,0) and (x < 0 or y < 0 or new_rect.right > parent_rect.right or new_rect.bottom > parent_rect.bottom):
                 #TODO create goo.Error class
@@ -129,10 +346,43 @@ class Element(gunge.sprite.Sprite):
         #set new position relative and absolute
         self._pos = (x, y)
         self.rect = new_rect
+        self.place()
 
     pos = property(get_pos, set_pos, doc="The position (topleft corner) of the element relative to its parent, in an (x, y) tuple).")
 
 
+def relayout():
+    """create and arrange again all elements whose layout was invalidated
+
+    after an element is created again, its parent is measured again as well, and so on up the tree,
+    until an ancestor is found whose size did not change. That ancestor is arranged in the area it
+    was given last time, which arranges the changed elements but leaves the rest of the tree alone.
+    """
+    if not _invalid:
+        return
+    pending = list(_invalid)
+    _invalid.clear()
+
+    roots = set()
+    for element in pending:
+        while True:
+            element.mark_dirty()
+            old = element.measured
+            if element.remeasure() == old or isinstance(element.parent, goo.NullParent):
+                break
+            element = element.parent
+        roots.add(element)
+
+    for root in roots:
+        if root.area is None:
+            continue
+        parent = root.parent
+        while not isinstance(parent, goo.NullParent) and parent not in roots:
+            parent = parent.parent
+        if isinstance(parent, goo.NullParent):
+            root.arrange(root.area)
+
+
 class Binder(gunge.event.Binder):
     """goo Binder that is slightly adapted to accomodate for goo event handling"""
 
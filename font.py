@@ -0,0 +1,99 @@
+#! /usr/bin/env python
+
+"""font.py - the shared font registry
+
+creating a pygame.font.Font object opens and parses the font file, which is far too slow to
+do for every widget. All of goo gets its fonts from this registry, which keeps a single Font
+object for every (path, height) combination.
+
+rendered text is cached as well: widgets showing the same string in the same font and color
+share a single surface, see render. Finally, every font has a Metrics object remembering the
+widths of words and glyphs measured with it, which is what the text layout code uses.
+"""
+
+import pygame
+import goo.draw
+
+# all fonts opened so far, by (path, height)
+fonts = {}
+
+_requests = 0
+
+# rendered text surfaces, by (font, text, antialias, color)
+text_cache = goo.draw.SurfaceCache(4 * 1024 * 1024)
+
+# Metrics objects, by font
+_metrics = {}
+
+
+class Metrics(object):
+    """measures text in a font, remembering the width of every piece of text it measured
+
+    words and single glyphs are measured with font.size only once. To keep memory use in check,
+    the remembered widths are thrown away when more than max_entries have been collected.
+    """
+
+    max_entries = 50000
+
+    def __init__(self, font):
+        """create the metrics for a pygame font object"""
+        self.font = font
+        self.widths = {}
+        self.linesize = font.get_linesize()
+
+    def width(self, text):
+        """return the width of a piece of text (usually a word or a single glyph)"""
+        try:
+            return self.widths[text]
+        except KeyError:
+            if len(self.widths) >= self.max_entries:
+                self.widths.clear()
+            width = self.widths[text] = self.font.size(text)[0]
+            return width
+
+    advance = width
+
+
+def get(path, height):
+    """return the shared font object for a font file and height, opening it if necessary"""
+    global _requests
+    _requests += 1
+    key = (path, height)
+    try:
+        return fonts[key]
+    except KeyError:
+        font = fonts[key] = pygame.font.Font(path, height)
+        return font
+
+def render(font, text, antialias, color):
+    """render text like font.render, returning a cached surface if the same text was rendered before
+
+    the surface is shared with every other widget showing the same text, so never draw on it.
+    """
+    color = tuple(color)
+    return text_cache.get((font, text, antialias, color), lambda: font.render(text, antialias, color))
+
+def metrics(font):
+    """return the Metrics object for a font"""
+    try:
+        return _metrics[font]
+    except KeyError:
+        m = _metrics[font] = Metrics(font)
+        return m
+
+def preload(*specs):
+    """open fonts ahead of time. Every argument is a (path, height) tuple"""
+    for path, height in specs:
+        get(path, height)
+
+def stats():
+    """return a dictionary with the number of fonts opened and the number of requests made
+
+    the statistics of the text cache can be retrieved with text_cache.stats().
+    """
+    return {'fonts': len(fonts), 'requests': _requests, 'reused': _requests - len(fonts)}
+
+def clear():
+    """forget all fonts and their metrics. Elements that already have a font keep using it"""
+    fonts.clear()
+    _metrics.clear()
@@ -0,0 +1,145 @@
+#! /usr/bin/env python
+
+"""imagecache.py - an on-disk cache of decoded images
+
+decoding PNG files takes most of the time spent loading images. The cache keeps the decoded pixels
+of every image it loaded, in a single file, keyed by the path and modification time of the image.
+The file is memory mapped, and cached images are surfaces pointing straight into the map, so a
+warm start neither decodes nor copies any pixels. To use the cache for goo's own images, call
+enable before the first widget is made.
+
+the file starts with MAGIC, a version byte and the offset of the index, followed by the pixel
+data of all images (as RGBA), and ends with the index: a marshalled dict of
+path: (mtime, offset, length, width, height).
+"""
+
+import atexit
+import marshal
+import mmap
+import os
+import struct
+import pygame
+import goo
+
+MAGIC = "GOOI"
+VERSION = 1
+HEADER = struct.Struct("<4sBQ")
+
+
+class ImageCache(object):
+    """a cache file of decoded images. load returns an image, from the cache if it is up to date
+
+    images that were not in the cache are only written to the file by save.
+    """
+
+    def __init__(self, filename):
+        """open the cache file filename. A missing or unreadable file makes an empty cache"""
+        self.filename = filename
+        self.index = {}
+        self.new = {}
+        self.map = None
+        self.hits = self.misses = 0
+        self.open()
+
+    def open(self):
+        """map the cache file and read its index"""
+        self.index, self.map = {}, None
+        try:
+            with open(self.filename, 'rb') as f:
+                magic, version, index_offset = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or version != VERSION:
+                    return
+                #a private mapping: surfaces can be written to without changing the file
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            self.index = marshal.loads(self.map[index_offset:])
+        except (IOError, struct.error, mmap.error, ValueError, EOFError, TypeError):
+            #a truncated or damaged file, which the next save replaces
+            if self.map is not None:
+                self.map.close()
+            self.index, self.map = {}, None
+
+    def load(self, path):
+        """return the image at path, decoding it only if the cache has no up to date copy"""
+        mtime = os.path.getmtime(path)
+        entry = self.index.get(path)
+        if entry is not None and entry[0] == mtime and path not in self.new:
+            self.hits += 1
+            mtime, offset, length, width, height = entry
+            return pygame.image.frombuffer(buffer(self.map, offset, length), (width, height), 'RGBA')
+
+        self.misses += 1
+        image = pygame.image.load(path)
+        data = pygame.image.tostring(image, 'RGBA')
+        self.new[path] = (mtime, image.get_width(), image.get_height(), data)
+        return pygame.image.frombuffer(data, image.get_size(), 'RGBA')
+
+    def save(self):
+        """write the cache file again, with the images loaded since it was opened
+
+        images whose file is gone are left out. Surfaces made from the old file stay valid.
+        """
+        if not self.new:
+            return
+        entries = [(path, mtime, width, height, buffer(self.map, offset, length))
+                   for path, (mtime, offset, length, width, height) in self.index.iteritems()
+                   if path not in self.new and os.path.exists(path)]
+        entries.extend((path, mtime, width, height, data)
+                       for path, (mtime, width, height, data) in self.new.iteritems())
+
+        #the old file is still mapped, and surfaces from load point into it. Writing a new file and
+        #renaming it over the old one leaves the mapping (and those surfaces) intact
+        temp = self.filename + ".tmp"
+        with open(temp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0))
+            index = {}
+            for path, mtime, width, height, data in entries:
+                index[path] = (mtime, f.tell(), len(data), width, height)
+                f.write(data)
+            index_offset = f.tell()
+            marshal.dump(index, f)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, index_offset))
+        os.rename(temp, self.filename)
+
+        self.new = {}
+        self.open()
+
+    def __len__(self):
+        return len(set(self.index) | set(self.new))
+
+
+class CachedImageLoader(object):
+    """an image loader reading images through an ImageCache
+
+    used like the other loaders: loader['check.png'] returns the image called check.png from the
+    first of the directories that has it. Every image is only looked up once.
+    """
+
+    def __init__(self, directories, cache):
+        """init CachedImageLoader. directories is a sequence of directory names"""
+        self.directories = directories
+        self.cache = cache
+        self.images = {}
+
+    def __getitem__(self, name):
+        try:
+            return self.images[name]
+        except KeyError:
+            pass
+        for directory in self.directories:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                image = self.images[name] = self.cache.load(os.path.abspath(path))
+                return image
+        raise KeyError("image not found: '%s'" % name)
+
+
+def enable(filename, directories=("goo/images",)):
+    """load goo's images through an image cache stored in filename, and return the cache
+
+    the cache is saved when the program exits.
+    """
+    cache = ImageCache(filename)
+    goo.img_loader.loader = CachedImageLoader(directories, cache)
+    atexit.register(cache.save)
+    return cache
@@ -1,13 +1,53 @@
 #! /usr/bin/env python
 
-"""parser.py: parse the xml documents into actual GUI elements"""
+"""parser.py: parse the xml documents into actual GUI elements
 
-import xml.dom.minidom as minidom
+documents are read with expat and turned into a tree of lightweight Node objects, holding only the
+elements and the text that is not whitespace. load_xml builds the widget for every top-level
+element as soon as the end tag is read, after which its nodes are thrown away, so no more than
+one top-level element is kept in memory at a time.
+
+layouts can also be compiled ahead of time into a binary file, which load_xml reads without
+parsing any xml (see compile_file). To compile every layout in a directory, run:
+
+    python -m goo.parser [-j PROCESSES] DIRECTORY...
+"""
+
+import xml.parsers.expat
+import collections
+import hashlib
+import marshal
+import multiprocessing
+import optparse
+import StringIO
+import os
+import sys
 import pygame
 import goo
 
 PARSE_ALL = 0
 
+# node types, equal to the ones used by xml.dom
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+
+# bytes read from the xml file at a time
+CHUNK_SIZE = 16384
+
+# compiled layout files start with MAGIC, VERSION and the sha1 digest of the xml they were made from
+MAGIC = "GOOC"
+VERSION = 1
+COMPILED_EXT = ".gooc"
+
+# the tag that text nodes are registered under
+TEXT_TAG = "#text"
+
+# (factory, takes_children) pairs, by tag. See register
+tags = {}
+
+# root nodes of the layout files of composite widgets, by source. See get_template
+templates = {}
+
 
 class ParseError(Exception):
     """Raised when an error occurs while parsing an xml document"""
@@ -22,102 +62,319 @@ class ParseError(Exception):
 def load_xml(filename, ids=None):
     """load an xml file and return the resulting widget(s)
 
-    this loads the filename given, turns it into a dom object, and then hands it over to the 
-    parse function, which builds a widget from it. the widget is then returned. If the 
-    document contains multiple widgets, the caller can specify which ones to build with a 
-    list of IDs, or pass in goo.parser.PARSE_ALL to build all widgets. A list of the built
-    widgets is returned. If no ids argument is given, only the first widget is built.
+    this reads the filename given (which can also be a file object), and builds a widget from every
+    element at the top of the document, while reading it. The built widget is then returned. If the
+    document contains multiple widgets, the caller can specify which ones to build with a list of
+    IDs, or pass in goo.parser.PARSE_ALL to build all widgets. A tuple of the built widgets is
+    returned. If no ids argument is given, only the first widget is built, and the rest of the file
+    is not read.
     """
-    root = get_root(filename)
-
+    widgets = []
     if ids is None:
-        return parse_firstchild(root)
+        def handle(node):
+            widgets.append(parse(node))
+            return True
     elif ids is PARSE_ALL:
-        return parse_all(root)
+        def handle(node):
+            widgets.append(parse(node))
     else:
-        return parse_ids(root, ids)
+        found = {}
+        def handle(node):
+            for match in find_ids(node, ids):
+                found[dict(match.attributes)['id']] = parse(match)
+            return len(found) == len(ids)
 
-def get_root(filename):
-    """get the root element of an xml document"""
-    if isinstance(filename, file):
-        filename.seek(0)
-
-    dom = minidom.parse(filename)
-    root = dom.documentElement
-    if root.tagName != "gamegoo":
-        raise ParseError("Invalid GameGoo XML document: invalid root node", filename)
-    return root
-
-def parse_firstchild(rootnode):
-    """parse the first child of some node"""
-    node = rootnode.firstChild
-    while node.nodeType in (3, 8):
-        node = node.nextSibling
-    widget = parse(node)
-    widget.arrange(pygame.Rect(10, 10, 0, 0))
-    return widget
+    read(filename, handle)
 
-def parse_all(rootnode):
-    """parse all children of a node"""
-    widgets = tuple(parse(node) for node in rootnode.childNodes if nodetype != 3)
-    for widget in widgets:
-        widget.arrange(pygame.Rect(10, 10, 0, 0))
-    return widgets
+    if ids is not None and ids is not PARSE_ALL:
+        missing = [id_ for id_ in ids if id_ not in found]
+        if missing:
+            raise ParseError("no element with id: %s" % ', '.join(missing), filename)
+        widgets = [found[id_] for id_ in ids]
+    elif not widgets:
+        raise ParseError("GameGoo XML document contains no widgets", filename)
 
-def parse_ids(rootnode, id_list):
-    """parse all children of a node with an id in id_list"""
-    doc = rootnode.ownerDocument
-    widgets = tuple(parse(doc.getElementbyId(id_)) for id_ in id_list)
     for widget in widgets:
         widget.arrange(pygame.Rect(10, 10, 0, 0))
-    return widgets
+    if ids is None:
+        return widgets[0]
+    return tuple(widgets)
+
+def get_root(filename):
+    """read an entire xml document and return its root node"""
+    return read(filename)
+
+def get_template(source):
+    """return the root node of the layout file source, as found by goo.xml_loader
+
+    used for the layout files of composite widgets. Each file is only read once, after which its
+    nodes are shared by every widget built from it. Nodes can't be changed, so this is safe.
+    """
+    try:
+        return templates[source]
+    except KeyError:
+        root = templates[source] = get_root(goo.xml_loader[source])
+        return root
+
+def read(filename, callback=None):
+    """read an xml document, and return its root node
+
+    if a callback is given, it is called with every child of the root node as soon as it is
+    complete, and these children are not added to the root node. If the callback returns True, the
+    rest of the document is not read.
+    """
+    if hasattr(filename, 'read'):
+        source = filename
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    else:
+        source = open(filename, 'rb')
+
+    try:
+        data = source.read(CHUNK_SIZE)
+        if data.startswith(MAGIC):
+            return read_compiled(data + source.read(), callback, filename)
+        return read_xml(source, data, callback, filename)
+    finally:
+        if source is not filename:
+            source.close()
+
+def read_xml(source, data, callback, filename):
+    """read an xml document from the file object source. data is what was read from it already"""
+    builder = TreeBuilder(callback, filename)
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = builder.start
+    parser.EndElementHandler = builder.end
+    parser.CharacterDataHandler = builder.characters
+    try:
+        while True:
+            parser.Parse(data, not data)
+            if not data or builder.done:
+                break
+            data = source.read(CHUNK_SIZE)
+    except xml.parsers.expat.ExpatError, e:
+        raise ParseError("Invalid XML: %s" % e, filename)
+    return builder.root
+
+def read_compiled(data, callback, filename):
+    """read a compiled layout (see compile_file) from the string data
+
+    the top-level nodes are made one at a time, so the callback works as it does for xml.
+    """
+    if data[len(MAGIC):len(MAGIC) + 1] != chr(VERSION):
+        raise ParseError("compiled layout has an unsupported version, compile it again", filename)
+    tag, attributes, children = marshal.loads(data[len(MAGIC) + 21:])
+    nodes = (from_tuple(child) for child in children)
+    if callback is None:
+        return Node(ELEMENT_NODE, tag, attributes, tuple(nodes), None)
+    for node in nodes:
+        if callback(node):
+            break
+    return Node(ELEMENT_NODE, tag, attributes, (), None)
+
+def to_tuple(node):
+    """turn a node into plain tuples and strings, which marshal can store"""
+    if node.nodeType == TEXT_NODE:
+        return node.data
+    return (node.tagName, node.attributes, tuple(to_tuple(child) for child in node.childNodes))
+
+def from_tuple(value):
+    """turn the result of to_tuple back into a node"""
+    if isinstance(value, basestring):
+        return Node(TEXT_NODE, None, None, (), value)
+    tag, attributes, children = value
+    return Node(ELEMENT_NODE, tag, attributes, tuple(from_tuple(child) for child in children), None)
+
+def compile_file(source, target=None):
+    """compile the xml layout file source into a binary file that load_xml reads faster
+
+    the target defaults to the source with its extension replaced by COMPILED_EXT. If the target
+    was already compiled from the same xml, nothing is done. Returns True if the file was compiled.
+    """
+    if target is None:
+        target = os.path.splitext(source)[0] + COMPILED_EXT
+    with open(source, 'rb') as f:
+        data = f.read()
+    header = MAGIC + chr(VERSION) + hashlib.sha1(data).digest()
+
+    try:
+        with open(target, 'rb') as f:
+            if f.read(len(header)) == header:
+                return False
+    except IOError:
+        pass
+
+    try:
+        root = get_root(StringIO.StringIO(data))
+    except ParseError, e:
+        e.filename = source
+        raise
+    #write to a temporary file first, so that a failed compile never leaves a broken target
+    temp = target + ".tmp"
+    with open(temp, 'wb') as f:
+        f.write(header)
+        marshal.dump(to_tuple(root), f)
+    os.rename(temp, target)
+    return True
+
+def compile_dir(directory, processes=None):
+    """compile every xml file in and below directory, in parallel. Returns the files compiled
+
+    processes is the number of worker processes, which defaults to the number of CPUs.
+    """
+    sources = [os.path.join(path, name) for path, dirs, files in os.walk(directory)
+               for name in files if name.endswith(".xml")]
+    pool = multiprocessing.Pool(processes)
+    try:
+        compiled = pool.map(compile_file, sources)
+    finally:
+        pool.close()
+        pool.join()
+    return [source for source, done in zip(sources, compiled) if done]
+
+def main(argv=None):
+    """command line entry point: compile the layout files in the directories given"""
+    opts = optparse.OptionParser(usage="python -m goo.parser [-j PROCESSES] DIRECTORY...")
+    opts.add_option("-j", "--processes", type="int", default=None,
+                    help="number of worker processes (default: number of CPUs)")
+    options, directories = opts.parse_args(argv)
+    if not directories:
+        opts.error("no directory given")
+
+    for directory in directories:
+        try:
+            compiled = compile_dir(directory, options.processes)
+        except ParseError, e:
+            print >> sys.stderr, "error: %s" % e
+            return 1
+        for source in compiled:
+            print "compiled %s" % source
+    return 0
+
+def find_ids(node, id_list):
+    """find the element nodes with an id in id_list, in and below node"""
+    if node.nodeType != ELEMENT_NODE:
+        return
+    if dict(node.attributes).get('id') in id_list:
+        yield node
+        return
+    for child in node.childNodes:
+        for match in find_ids(child, id_list):
+            yield match
+
+
+class Node(collections.namedtuple('Node', 'nodeType tagName attributes childNodes data')):
+    """a node of a parsed xml document
+
+    an element node has a tagName, a tuple of (name, value) attributes and a tuple of childNodes.
+    A text node only has data. The names are the ones used by xml.dom. Nodes are immutable, so
+    trees can be shared (see get_template).
+    """
+    __slots__ = ()
+
+
+class TreeBuilder(object):
+    """turns the events of an expat parser into a tree of Node objects"""
+
+    def __init__(self, callback=None, filename="Unknown"):
+        """init TreeBuilder. See read for the callback argument"""
+        self.callback = callback
+        self.filename = filename
+        self.stack = []
+        self.text = []
+        self.root = None
+        self.done = False
+
+    def start(self, tag, attributes):
+        """an element starts"""
+        self.flush()
+        if not self.stack and tag != "gamegoo":
+            raise ParseError("Invalid GameGoo XML document: invalid root node", self.filename)
+        attributes = tuple((str(name), value) for name, value in attributes.iteritems())
+        self.stack.append((str(tag), attributes, []))
+
+    def end(self, tag):
+        """an element ends"""
+        self.flush()
+        tag, attributes, children = self.stack.pop()
+        self.add(Node(ELEMENT_NODE, tag, attributes, tuple(children), None))
+
+    def characters(self, data):
+        """text was read. Text may be reported in pieces, so it is collected until the next tag"""
+        self.text.append(data)
+
+    def flush(self):
+        """add the text collected since the last tag, unless it is whitespace"""
+        if self.text:
+            data = ''.join(self.text)
+            self.text = []
+            if self.stack and not data.isspace():
+                self.add(Node(TEXT_NODE, None, None, (), data))
+
+    def add(self, node):
+        """add a complete node to its parent, or hand it to the callback"""
+        if not self.stack:
+            self.root = node
+        elif len(self.stack) == 1 and self.callback is not None:
+            #the rest of the chunk being parsed is still reported once done
+            if not self.done and self.callback(node):
+                self.done = True
+        else:
+            self.stack[-1][2].append(node)
+
+
+def register(factory=None, name=None):
+    """register a widget factory (usually an element class) for the tag called name
+
+    name defaults to the name of the factory, so this can be used as a class decorator, either
+    plain (@goo.parser.register) or with arguments (@goo.parser.register(name="Foo")). If the
+    factory has a true takes_children attribute, it is called with the parent, the child nodes
+    and the attributes of the tag, like containers are. Otherwise, it is called with the parent
+    and the attributes. Registering a tag that is already in use replaces the old factory.
+    """
+    if factory is None:
+        return lambda factory: register(factory, name)
+    tags[name or factory.__name__] = (factory, getattr(factory, 'takes_children', False))
+    return factory
 
 def parse(node, parent=None):
-    """Parse a DOM node and create a widget from it
+    """Parse a node and create a widget from it
 
-    takes an xml DOM node and creates a widget from it.
+    takes a Node and creates a widget from it.
     The node is attached to the parent, if specified. Otherwise, the special NullParent is used.
     the nodes' children are handed to the created widget to also be parsed.
     """
     if parent is None:
         parent = goo.NullParent()
-    widget = get_widget(node)
+    widget, takes_children = get_factory(node)
 
-    if issubclass(widget, goo.containers.Container):
+    if takes_children:
         widget = widget(parent, node.childNodes, **get_attributes(node))
     else:
         widget = widget(parent, **get_attributes(node))
     return widget
 
-def get_widget(node):
-    """Retrieve a widget for a certain node.
+def get_factory(node):
+    """Retrieve the (factory, takes_children) pair registered for a node (see register)
 
-    Every node has an associated widget that must be built. This function fetches
-    the relevant class to do so. It uses the string of the tagname to retrieve the right class.
+    text nodes use the factory registered for TEXT_TAG, which is StaticText.
     """
-    #we make an exception for untagged text. It's synonymous to the StaticText control
-    if node.nodeType == 3:
-        if not node.data.isspace():
-            return goo.controls.text.StaticText
-        else:
-            class x(object):
-                def __new__(cls, *args, **xargs): return None
-            return x
+    try:
+        return tags[node.tagName or TEXT_TAG]
+    except KeyError:
+        raise ParseError("encountered invalid tag: '%s'" % node.tagName)
 
-    #the widget could be located in one of several modules. We'll have to try them all
-    for module in (goo.controls, goo.containers, goo.composite):
-        try:
-            return getattr(module, node.tagName)
-        except AttributeError:
-            continue
-    #not a registered widget, error
-    raise ParseError("encountered invalid tag: '%s'" % node.tagName)
+def get_widget(node):
+    """Retrieve the widget class (or other factory) for a certain node"""
+    return get_factory(node)[0]
 
 def get_attributes(node):
     """retrieve a dictionary of the attributes for a node"""
-    if node.nodeType == 3:
+    if node.nodeType == TEXT_NODE:
         return {'text': node.data}
+    return dict(node.attributes)
+
 
-    attr_map = node.attributes
-    attributes = (attr_map.item(i) for i in range(attr_map.length))
-    return dict((str(attr.name), attr.value) for attr in attributes)
+if __name__ == '__main__':
+    sys.exit(main())
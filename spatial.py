@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+
+"""spatial.py - a spatial index for finding the elements under the mouse pointer"""
+
+import pygame
+
+
+class GridIndex(object):
+    """a uniform grid laid over the screen, holding elements by the cells their rect touches
+
+    finding the elements at a point only tests the elements in one cell, so it takes the
+    same time no matter how many elements there are. Elements must be updated in the index
+    whenever their rect changes.
+    """
+
+    def __init__(self, cell_size=64):
+        """create an empty index with square cells of cell_size pixels"""
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        # incremented on every change, so users can tell if the index changed
+        self.version = 0
+
+    def __contains__(self, element):
+        return element in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def cells_for(self, rect):
+        """return the keys of all cells touched by a rect"""
+        size = self.cell_size
+        return [(x, y) for x in range(rect.left // size, (rect.right - 1) // size + 1)
+                       for y in range(rect.top // size, (rect.bottom - 1) // size + 1)]
+
+    def update(self, element):
+        """add an element to the index, or update its position if it's already in there"""
+        rect = pygame.Rect(element.rect)
+        entry = self.entries.get(element)
+        if entry is not None:
+            if entry[0] == rect:
+                return
+            self.remove(element)
+        keys = self.cells_for(rect)
+        for key in keys:
+            self.cells.setdefault(key, set()).add(element)
+        self.entries[element] = (rect, keys)
+        self.version += 1
+
+    def remove(self, element):
+        """remove an element from the index. Does nothing if it isn't in there"""
+        entry = self.entries.pop(element, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            cell = self.cells[key]
+            cell.discard(element)
+            if not cell:
+                del self.cells[key]
+        self.version += 1
+
+    def touch(self):
+        """change the version without moving anything, e.g. when an element was hidden or shown"""
+        self.version += 1
+
+    def at(self, pos):
+        """return a list of all elements whose rect contains pos"""
+        size = self.cell_size
+        cell = self.cells.get((pos[0] // size, pos[1] // size), ())
+        return [element for element in cell if self.entries[element][0].collidepoint(pos)]
+
+    def clear(self):
+        """remove all elements from the index"""
+        self.cells.clear()
+        self.entries.clear()
+        self.version += 1
@@ -1,11 +1,22 @@
 #! /usr/bin/env python
 
 import pygame
+import collections
+import weakref
+import goo.font
 
 """style.py - The GUI Style object.
 
 the Style object is used to apply different styles to gui elements.
-The object functions like a dictionary
+The object functions like a dictionary. A style can inherit the options it doesn't set from
+a parent style, and from DEFAULT_OPTIONS if it has none.
+
+elements don't use Style objects directly. get resolves a style and all its parents into a
+ResolvedStyle, which holds the value of every option as a plain attribute (style.padding).
+Resolved styles are kept until the style or one of its parents changes.
+
+to change a style while the program runs, use update. It tells every element using the style,
+or a style inheriting from it, which options changed (see Element.restyle).
 """
 # this is used in multiple options
 DEFAULT_SURFACE = pygame.Surface((100, 100))
@@ -41,20 +52,20 @@ class Style(dict):
     when iterating, printing, or calling methods such as iteritems() on
     this object, options not set (i.e. defaults) are not included.
     """
-    __slots__ = 'name'
+    __slots__ = 'name', 'parent'
 
-    def __init__(self, name, **kwargs):
+    def __init__(self, name, parent=None, **kwargs):
         """Create a new Style object.
 
-        Any options that you don't specify will be taken from the DEFAULT_OPTIONS
-        options. The options are passed into the constructor as keyword
-        arguments. If you have options in a dictionary, use extended call
-        syntax: Style(**options)
+        Any options that you don't specify will be taken from the style registered under the
+        name parent, or from the DEFAULT_OPTIONS options if there is no parent. The options are
+        passed into the constructor as keyword arguments. If you have options in a dictionary,
+        use extended call syntax: Style(**options)
         """
         dict.__init__(self)
+        self.name, self.parent = name, parent
         for key, value in kwargs.items():
             self[key] = value
-        self.name = name
 
     def __setitem__(self, key, value):
         """set a style option.
@@ -69,6 +80,8 @@ class Style(dict):
             raise TypeError("new value of '%s' is of wrong type ('%s' instead of '%s')" % (key, type(value), type(DEFAULT_OPTIONS[key])))
         else:
             dict.__setitem__(self, key, value)
+            if style_dict.get(self.name) is self:
+                invalidate(self.name)
 
     def __missing__(self, key):
         """called in case a non-existant key is requested
@@ -86,25 +99,149 @@ class Style(dict):
     def __str__(self):
         return "<Style %s %s>" % (self.name, dict.__str__(self)) 
 
-    def font(self):
-        """shortcut for making a font object from this goo style object"""
-        return pygame.font.Font(self['font'], self['font_height'])
+
+class ResolvedStyle(object):
+    """a style with its parents applied, holding every option as an attribute
+
+    made by get, and can't be changed. To change a style, change the Style object it was
+    resolved from. Indexing (style['padding']) works as well, but attribute access is faster.
+    """
+    __slots__ = ('name',) + tuple(sorted(DEFAULT_OPTIONS))
+
+    def __init__(self, name, options):
+        """init ResolvedStyle. options must hold a value for every option"""
+        object.__setattr__(self, 'name', name)
+        for key, value in options.iteritems():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("resolved style '%s' can't be changed, change the Style instead" % self.name)
+
+    def __getitem__(self, key):
+        if key not in DEFAULT_OPTIONS:
+            raise KeyError("Attempt to retrieve invalid GUI style option: '%s'" % key)
+        return getattr(self, key)
+
+    def __str__(self):
+        return "<ResolvedStyle %s>" % self.name
+
+    def options(self):
+        """return a dict of all options"""
+        return dict((key, getattr(self, key)) for key in DEFAULT_OPTIONS)
+
+    def get_font(self):
+        """shortcut for getting the shared font object for this goo style object"""
+        return goo.font.get(self.font, self.font_height)
 
 
 # dict of all registered styles. Styles must be registered to be recognised in XML
 style_dict = {'default': Style("default")}
 
+# resolved styles by name, and the names of the styles inheriting from each style. See get
+resolved = {}
+derived = {}
+
+# the elements using each style, by style name. See use
+users = {}
+
 def add(style):
     """add a style to the XML-recognised style list
 
     note that if a style with the same name was already present, it will be overwritten.
     """
     style_dict[style.name] = style
+    invalidate(style.name)
 
 def get(name='default'):
-    """retrieve a style from the XML-recognised style list by its name"""
-    return style_dict[name]
+    """retrieve a style from the XML-recognised style list by its name, as a ResolvedStyle"""
+    try:
+        return resolved[name]
+    except KeyError:
+        return resolve(name)
+
+def use(element, name):
+    """return the resolved style called name, and remember that element uses it
+
+    elements call this instead of get, so that update can find them. An element only uses one
+    style at a time, so it stops using the style it had before.
+    """
+    style = get(name)
+    release(element)
+    users.setdefault(name, weakref.WeakSet()).add(element)
+    return style
+
+def release(element):
+    """forget that element uses its style"""
+    old = getattr(element, 'style', None)
+    if old is not None and old.name in users:
+        users[old.name].discard(element)
+
+def update(name, **options):
+    """change options of the registered style called name, and update the elements using it
+
+    every element using the style, or a style inheriting from it, is restyled with the set of
+    options whose value actually changed. Depending on the options, the element is either created
+    and laid out again, or only drawn again, both of which happen in the next frame.
+    """
+    style = style_dict[name]
+    for key, value in options.items():
+        style[key] = value
+
+    for name in lineage(name):
+        new, changes = get(name), {}
+        for element in list(users.get(name, ())):
+            old = element.style
+            if old not in changes:
+                changes[old] = frozenset(key for key in DEFAULT_OPTIONS if getattr(old, key) != getattr(new, key))
+            element.restyle(new, changes[old])
+
+def lineage(name):
+    """return a list of name and the names of all registered styles inheriting from it"""
+    names = [name]
+    for parent in names:
+        for style in style_dict.itervalues():
+            if style.parent == parent and style.name not in names:
+                names.append(style.name)
+    return names
+
+def resolve(name, _seen=()):
+    """resolve the style called name and its parents into a ResolvedStyle"""
+    if name in _seen:
+        raise RuntimeError("style '%s' inherits from itself" % name)
+    style = style_dict[name]
+    if style.parent is None:
+        options = dict(DEFAULT_OPTIONS)
+    else:
+        if style.parent not in resolved:
+            resolve(style.parent, _seen + (name,))
+        options = resolved[style.parent].options()
+        derived.setdefault(style.parent, set()).add(name)
+    options.update(style)
+    result = resolved[name] = ResolvedStyle(name, options)
+    return result
+
+def invalidate(name):
+    """forget the resolved style called name and the resolved styles inheriting from it"""
+    resolved.pop(name, None)
+    for child in derived.pop(name, ()):
+        invalidate(child)
+
+# layout directives, by attribute name. See directive()
+directives = collections.OrderedDict()
+
+def directive(func, name=None):
+    """register func as the layout directive for the attribute called name
+
+    name defaults to the name of the function, so this can be used as a decorator. When an element
+    is arranged, the directive for every one of its attributes that has one is called with the
+    element, the area it was allotted and the attribute value. Registering a directive under a name
+    that is already in use replaces the old one. Elements look up their directives when they are
+    created, so directives should be registered before the elements that use them are made.
+    """
+    directives[name or func.__name__] = func
+    return func
 
+@directive
 def align(element, area, arg):
     """align the element in the given area
 
@@ -119,6 +256,7 @@ def align(element, area, arg):
     else:
         raise RuntimeError("Invalid value of attribute align: %s" % arg)
 
+@directive
 def valign(element, area, arg):
     """align the element vertically in the given area
 
@@ -133,16 +271,16 @@ def valign(element, area, arg):
     else:
         raise RuntimeError("Invalid value of attribute valign: %s" % arg)
 
+@directive
 def expand(element, area, arg):
     """expand the element to cover all available space
 
     argument can be either True or False. Of course, the false case is default,
-    so rather pointless, but it's there for the sake of consistency
+    so rather pointless, but it's there for the sake of consistency. Containers arrange
+    their children after this, so they fill the new size.
     """
     if arg == "True":
         element.pos = area.topleft
         element.rect.size = area.size
-        #we've changed our size! better rearrange children
-        element.arrange_children()
     elif arg != "False":
         raise RuntimeError("Invalid value of attribute expand: %s" % arg)